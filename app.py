@@ -1,11 +1,33 @@
+import click
 from flask import Flask
 from controllers.seller_controller import app as seller_controller_app
 from controllers.sale_controller import app as sale_controller_app
-from database.database import init_db
+from controllers.health_controller import app as health_controller_app
+from database.database import SessionLocal, init_db
+from services.sale_service import SaleService
+from utils.uploads import UploadRequest
 
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.register_blueprint(seller_controller_app)
 app.register_blueprint(sale_controller_app)
+app.register_blueprint(health_controller_app)
+
+
+@app.cli.command('rebuild-aggregates')
+@click.option('--check', is_flag=True, help='Only report mismatches without rewriting the aggregate tables.')
+def rebuild_aggregates(check):
+    init_db()
+    db = SessionLocal()
+    try:
+        mismatches = SaleService(db).rebuild_sales_aggregates(repair=not check)
+    finally:
+        db.close()
+    for mismatch in mismatches:
+        click.echo(f"{mismatch['dimension']} {mismatch['key']}: expected {mismatch['expected']}, stored {mismatch['stored']}")
+    click.echo(f"{len(mismatches)} mismatched aggregate rows" + ("" if check else ", tables rebuilt"))
+    if check and mismatches:
+        raise SystemExit(1)
 
 
 if __name__ == '__main__':
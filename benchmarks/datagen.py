@@ -0,0 +1,103 @@
+"""Seeded generators for seller rosters and sales files in the upload formats.
+
+    python -m benchmarks.datagen --sellers 10000 --sales 1000000 --output-dir /tmp/bench
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from services.commission_engine import DATE_FORMAT
+from utils.document_utils import FIRST_DIGIT_WEIGHTS, SECOND_DIGIT_WEIGHTS, check_digits
+
+WRITE_CHUNK_SIZE = 500_000
+STATES = np.array(["SP", "RJ", "MG", "RS", "PR", "BA", "SC", "PE", "CE", "GO"])
+CHANNELS = np.array(["Online", "Telefone", "Loja física"])
+CLIENT_TYPES = np.array(["Novo", "Fidelizado"])
+SALES_START = np.datetime64('2023-01-01T00:00:00')
+SALES_PERIOD_SECONDS = 365 * 24 * 60 * 60
+# A valid CPF that is never handed out to a generated seller.
+UNKNOWN_CPF = '00000000191'
+
+
+def generate_cpfs(count: int, rng: np.random.Generator) -> list:
+    cpfs = []
+    seen = {UNKNOWN_CPF}
+    while len(cpfs) < count:
+        digits = rng.integers(0, 10, size=(max(count - len(cpfs), 1) * 2, 9))
+        first_digit = check_digits(digits @ FIRST_DIGIT_WEIGHTS)
+        digits = np.column_stack([digits, first_digit])
+        second_digit = check_digits(digits @ SECOND_DIGIT_WEIGHTS)
+        digits = np.column_stack([digits, second_digit])
+        for row in digits[~(digits == digits[:, :1]).all(axis=1)]:
+            cpf = ''.join(map(str, row))
+            if cpf not in seen:
+                seen.add(cpf)
+                cpfs.append(cpf)
+                if len(cpfs) == count:
+                    break
+    return cpfs
+
+
+def write_sellers_file(path: str, cpfs: list, rng: np.random.Generator):
+    count = len(cpfs)
+    birth_days = rng.integers(0, 40 * 365, size=count)
+    sellers = pd.DataFrame({
+        'Nome': [f"Seller {index}" for index in range(count)],
+        'CPF': cpfs,
+        'Data de Nascimento': (np.datetime64('1960-01-01') + birth_days).astype('datetime64[D]'),
+        'Email': [f"seller{index}@example.com" for index in range(count)],
+        'Estado': rng.choice(STATES, size=count)
+    })
+    sellers['Data de Nascimento'] = sellers['Data de Nascimento'].dt.strftime("%d/%m/%Y")
+    sellers.to_csv(path, index=False)
+
+
+def write_sales_file(path: str, cpfs: list, rows: int, rng: np.random.Generator,
+                     unknown_fraction: float = 0.0, chunk_size: int = WRITE_CHUNK_SIZE):
+    cpfs = np.array(cpfs)
+    with open(path, 'w', newline='') as file:
+        file.write("CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n")
+        for start in range(0, rows, chunk_size):
+            size = min(chunk_size, rows - start)
+            sellers = rng.choice(cpfs, size=size)
+            if unknown_fraction:
+                # CPFs of sellers that don't exist, to exercise the rejection path.
+                unknown = rng.random(size) < unknown_fraction
+                sellers[unknown] = UNKNOWN_CPF
+            dates = SALES_START + rng.integers(0, SALES_PERIOD_SECONDS, size=size).astype('timedelta64[s]')
+            pd.DataFrame({
+                'CPF': sellers,
+                'Valor': rng.uniform(10, 5000, size=size).round(2),
+                'Canal de Venda': rng.choice(CHANNELS, size=size),
+                'Data': pd.Series(dates).dt.strftime(DATE_FORMAT),
+                'Tipo de Cliente': rng.choice(CLIENT_TYPES, size=size),
+                'Moeda': 'BRL'
+            }).to_csv(file, header=False, index=False)
+
+
+def generate_dataset(directory: str, sellers: int, sales: int, seed: int = 42, unknown_fraction: float = 0.0):
+    rng = np.random.default_rng(seed)
+    cpfs = generate_cpfs(sellers, rng)
+    sellers_path = os.path.join(directory, f'sellers-{sellers}.csv')
+    sales_path = os.path.join(directory, f'sales-{sales}.csv')
+    write_sellers_file(sellers_path, cpfs, rng)
+    write_sales_file(sales_path, cpfs, sales, rng, unknown_fraction)
+    return {'cpfs': cpfs, 'sellers_path': sellers_path, 'sales_path': sales_path}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sellers', type=int, default=10_000)
+    parser.add_argument('--sales', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--unknown-fraction', type=float, default=0.0)
+    parser.add_argument('--output-dir', default='.')
+    args = parser.parse_args()
+
+    dataset = generate_dataset(args.output_dir, args.sellers, args.sales, args.seed, args.unknown_fraction)
+    print(dataset['sellers_path'])
+    print(dataset['sales_path'])
+
+
+if __name__ == '__main__':
+    main()
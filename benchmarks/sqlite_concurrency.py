@@ -0,0 +1,106 @@
+"""Measure /sales/summary reader latency while a large commission upload writes.
+
+Runs the same workload once per SQLite profile and prints a JSON report:
+
+    python -m benchmarks.sqlite_concurrency --rows 200000 --readers 4
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime
+import numpy as np
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+from benchmarks.datagen import STATES, generate_cpfs, write_sales_file
+from database.database import Base, SQLITE_PROFILES, apply_sqlite_profile
+from repositories.seller_repository import SellerRepository
+from services.sale_service import SaleService
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_profile(profile, rows, readers, sellers, seed):
+    rng = np.random.default_rng(seed)
+    with tempfile.TemporaryDirectory() as directory:
+        engine = create_engine(
+            f"sqlite:///{os.path.join(directory, 'bench.db')}",
+            connect_args={"check_same_thread": False, "timeout": 30}
+        )
+        apply_sqlite_profile(engine, profile)
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        cpfs = generate_cpfs(sellers, rng)
+        with Session() as db:
+            SellerRepository(db).upsert_sellers_bulk([
+                {'cpf': cpf, 'name': f"Seller {cpf}", 'birth_date': datetime(1990, 1, 1).date(),
+                 'email': f"{cpf}@example.com", 'state': state}
+                for cpf, state in zip(cpfs, rng.choice(STATES, size=sellers))
+            ])
+        sales_path = os.path.join(directory, 'sales.csv')
+        write_sales_file(sales_path, cpfs, rows, rng)
+
+        stop = threading.Event()
+        latencies = []
+        errors = []
+
+        def read_summaries():
+            with Session() as db:
+                service = SaleService(db)
+                while not stop.is_set():
+                    started = time.perf_counter()
+                    try:
+                        service.get_sales_summary()
+                    except OperationalError as error:
+                        errors.append(str(error.orig))
+                    db.rollback()
+                    latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=read_summaries) for _ in range(readers)]
+        for thread in threads:
+            thread.start()
+        started = time.perf_counter()
+        with Session() as db:
+            SaleService(db).calculate_commissions(sales_path)
+        write_seconds = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join()
+        engine.dispose()
+
+    return {
+        'profile': profile,
+        'rows': rows,
+        'readers': readers,
+        'write_seconds': round(write_seconds, 3),
+        'reader_requests': len(latencies),
+        'reader_p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'reader_p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+        'reader_max_ms': round(max(latencies) * 1000, 2) if latencies else None,
+        'reader_errors': len(errors)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--sellers', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--profiles', nargs='+', default=list(SQLITE_PROFILES), choices=list(SQLITE_PROFILES))
+    args = parser.parse_args()
+
+    report = [run_profile(profile, args.rows, args.readers, args.sellers, args.seed) for profile in args.profiles]
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == '__main__':
+    main()
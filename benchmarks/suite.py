@@ -0,0 +1,249 @@
+"""Time uploads, summaries and seller listings at several data scales.
+
+Each scale runs twice on a fresh database, once through the Flask test client
+and once through the service methods, followed by the row hashing and the
+table rehash of migration 5 on their own. The timings go to a JSON report:
+
+    python -m benchmarks.suite --scales 10000 100000 --output report.json
+    python -m benchmarks.suite --scales 10000 100000 --baseline report.json
+
+With --baseline, medians slower than the baseline by more than --tolerance are
+listed and the command exits with status 1. The suite uses a throwaway SQLite
+database unless --database-url is given; that database is dropped and
+recreated for every scale.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from benchmarks.datagen import generate_dataset
+
+DEFAULT_SCALES = [10_000, 100_000]
+NOISE_FLOOR_SECONDS = 0.005
+
+
+def measure(function, repeat: int = 1, rows: int = None, before=None) -> dict:
+    samples = []
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - started)
+    result = {
+        'runs': repeat,
+        'min_s': round(min(samples), 6),
+        'median_s': round(statistics.median(samples), 6),
+        'max_s': round(max(samples), 6)
+    }
+    if rows:
+        result['rows_per_s'] = round(rows / statistics.median(samples), 1)
+    return result
+
+
+def expect_ok(response):
+    if response.status_code not in (200, 304):
+        raise RuntimeError(f"{response.request.method} {response.request.path} returned {response.status_code}: "
+                           f"{response.get_data(as_text=True)[:200]}")
+    return response
+
+
+def upload(client, url: str, path: str):
+    with open(path, 'rb') as file:
+        return expect_ok(client.post(url, data={'file': (file, os.path.basename(path))},
+                                     content_type='multipart/form-data'))
+
+
+def run_http_lane(client, dataset: dict, rows: int, sellers: int, repeat: int) -> dict:
+    from utils.response_cache import summary_cache
+
+    cpf = dataset['cpfs'][0]
+    results = {
+        'POST /sellers/load': measure(lambda: upload(client, '/sellers/load', dataset['sellers_path']), rows=sellers),
+        'POST /commissions/calculate': measure(
+            lambda: upload(client, '/commissions/calculate', dataset['sales_path']), rows=rows
+        ),
+        'POST /commissions/calculate (replay)': measure(
+            lambda: upload(client, '/commissions/calculate', dataset['sales_path']), rows=rows
+        )
+    }
+    reads = {
+        'GET /sales/summary': '/sales/summary',
+        'GET /sales/summary?channel=Online': '/sales/summary?channel=Online',
+        'GET /sales/summary/<cpf>': f'/sales/summary/{cpf}',
+        'GET /sales/<cpf>': f'/sales/{cpf}',
+        'GET /sales/<cpf>?limit=100': f'/sales/{cpf}?limit=100'
+    }
+    for name, url in reads.items():
+        results[name] = measure(lambda: expect_ok(client.get(url)), repeat, before=summary_cache.clear)
+    results['GET /sales/summary (cached)'] = measure(lambda: expect_ok(client.get('/sales/summary')), repeat)
+    return results
+
+
+def run_service_lane(session_factory, dataset: dict, rows: int, sellers: int, repeat: int) -> dict:
+    from services.sale_service import SaleService
+    from services.seller_service import SellerService
+
+    def call(service_class, method, *args):
+        def run():
+            with session_factory() as db:
+                getattr(service_class(db), method)(*args)
+        return run
+
+    cpf = dataset['cpfs'][0]
+    return {
+        'SellerService.load_sellers_from_csv': measure(
+            call(SellerService, 'load_sellers_from_csv', dataset['sellers_path']), rows=sellers
+        ),
+        'SaleService.calculate_commissions': measure(
+            call(SaleService, 'calculate_commissions', dataset['sales_path']), rows=rows
+        ),
+        'SaleService.get_sales_summary': measure(call(SaleService, 'get_sales_summary'), repeat),
+        'SaleService.get_sales_summary(channel)': measure(
+            call(SaleService, 'get_sales_summary', {'channel': 'Online'}), repeat
+        ),
+        'SaleService.get_sales_by_seller': measure(call(SaleService, 'get_sales_by_seller', cpf), repeat),
+        'SaleService.get_summary_by_seller': measure(call(SaleService, 'get_summary_by_seller', cpf), repeat)
+    }
+
+
+def run_component_lane(session_factory, dataset: dict, rows: int) -> dict:
+    import pandas as pd
+    from database.migrations import rehash_sales_rows
+    from services.commission_engine import build_sales_frame
+    from services.sale_service import SALES_CHUNK_SIZE
+    from utils.row_hash import SaleRowHasher
+
+    # Parsed up front, so only the hashing is timed.
+    frames = [
+        build_sales_frame(chunk)
+        for chunk in pd.read_csv(dataset['sales_path'], dtype={'CPF': str}, chunksize=SALES_CHUNK_SIZE)
+    ]
+
+    def hash_upload():
+        hasher = SaleRowHasher()
+        for frame in frames:
+            hasher.hash(frame)
+
+    def rehash_table():
+        with session_factory() as db:
+            rehash_sales_rows(db)
+            db.commit()
+
+    return {
+        'SaleRowHasher.hash': measure(hash_upload, rows=rows),
+        'rehash_sales_rows (migration 5)': measure(rehash_table, rows=rows)
+    }
+
+
+def run_suite(scales, sellers: int, repeat: int, seed: int, directory: str) -> dict:
+    from app import app
+    from database.database import Base, SessionLocal, engine, init_db
+
+    def reset_database():
+        Base.metadata.drop_all(engine)
+        init_db()
+
+    report = {'meta': report_metadata(engine, seed, repeat), 'scales': []}
+    for rows in scales:
+        seller_count = sellers or max(100, rows // 100)
+        dataset = generate_dataset(directory, seller_count, rows, seed)
+
+        reset_database()
+        http = run_http_lane(app.test_client(), dataset, rows, seller_count, repeat)
+        reset_database()
+        service = run_service_lane(SessionLocal, dataset, rows, seller_count, repeat)
+        # Runs on the sales the service lane just stored.
+        component = run_component_lane(SessionLocal, dataset, rows)
+
+        report['scales'].append({
+            'sales_rows': rows,
+            'sellers': seller_count,
+            'measurements': {**http, **service, **component}
+        })
+        os.remove(dataset['sellers_path'])
+        os.remove(dataset['sales_path'])
+    engine.dispose()
+    return report
+
+
+def report_metadata(engine, seed: int, repeat: int) -> dict:
+    try:
+        revision = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+    return {
+        'created_at': datetime.now().isoformat(),
+        'revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'database': engine.dialect.name,
+        'seed': seed,
+        'repeat': repeat
+    }
+
+
+def compare_reports(report: dict, baseline: dict, tolerance: float) -> list:
+    baseline_scales = {scale['sales_rows']: scale['measurements'] for scale in baseline['scales']}
+    regressions = []
+    for scale in report['scales']:
+        previous = baseline_scales.get(scale['sales_rows'], {})
+        for name, measurement in scale['measurements'].items():
+            if name not in previous:
+                continue
+            current, before = measurement['median_s'], previous[name]['median_s']
+            if current > before * (1 + tolerance) and current - before > NOISE_FLOOR_SECONDS:
+                regressions.append({
+                    'sales_rows': scale['sales_rows'],
+                    'measurement': name,
+                    'baseline_s': before,
+                    'current_s': current,
+                    'ratio': round(current / before, 2) if before else None
+                })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='Sales rows per scale')
+    parser.add_argument('--sellers', type=int, help='Sellers per scale (default: 1%% of the sales rows, at least 100)')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per read measurement')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--baseline', help='Earlier report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.20, help='Allowed slowdown before a regression is reported')
+    parser.add_argument('--database-url', help='Database to benchmark against; it is dropped and recreated')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # The app's engine is built from DATABASE_URL at import time.
+        os.environ['DATABASE_URL'] = args.database_url or f"sqlite:///{os.path.join(directory, 'bench.db')}"
+        report = run_suite(args.scales, args.sellers, args.repeat, args.seed, directory)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            report['regressions'] = compare_reports(report, json.load(file), args.tolerance)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+    if report.get('regressions'):
+        for regression in report['regressions']:
+            print(f"{regression['measurement']} at {regression['sales_rows']} rows: "
+                  f"{regression['baseline_s']}s -> {regression['current_s']}s", file=sys.stderr)
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
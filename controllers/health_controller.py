@@ -0,0 +1,43 @@
+from flask import Blueprint, Response, jsonify
+from database.database import get_pool_metrics
+from repositories.seller_cache import seller_cache
+from utils.instrumentation import instrument_app, labels, registry
+from utils.profiling import install_profiler
+from utils.response_cache import summary_cache
+
+PROMETHEUS_MIMETYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+app = Blueprint('health', __name__)
+
+@app.record_once
+def register_instrumentation(state):
+    instrument_app(state.app)
+    install_profiler(state.app)
+
+@app.route('/health/db', methods=['GET'])
+def get_db_health():
+    return jsonify(get_pool_metrics())
+
+@app.route('/health/cache', methods=['GET'])
+def get_cache_health():
+    return jsonify({'sellers': seller_cache.metrics(), 'summaries': summary_cache.metrics()})
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    pool = get_pool_metrics()
+    caches = {'sellers': seller_cache.metrics(), 'summaries': summary_cache.metrics()}
+    gauges = {
+        'db_pool_connections': ('Pooled database connections by state.', [
+            (labels(state=state), pool[state]) for state in ('checked_in', 'checked_out', 'overflow')
+            if pool[state] is not None
+        ]),
+        'cache_events': ('Cache lookups and evictions since start.', [
+            (labels(cache=cache, event=event), metrics[event])
+            for cache, metrics in caches.items()
+            for event in ('hits', 'misses', 'evictions', 'expirations') if event in metrics
+        ]),
+        'cache_entries': ('Entries held by each cache.', [
+            (labels(cache=cache), metrics['size']) for cache, metrics in caches.items()
+        ])
+    }
+    return Response(registry.render(gauges), mimetype=PROMETHEUS_MIMETYPE)
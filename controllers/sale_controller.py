@@ -1,45 +1,149 @@
-from flask import Blueprint, request, jsonify, make_response
-from database.database import SessionLocal
+import os
+import tempfile
+from flask import Blueprint, current_app, request, jsonify, make_response, url_for
+from database.data_version import data_version
+from database.database import SessionLocal, detach_db, engine, get_db, install_session_teardown
+from services.commission_jobs import CommissionJobRunner
 from services.sale_service import SaleService
+from utils.instrumentation import add_rows, instrument_app, phase
+from utils.profiling import install_profiler
+from utils.pagination import parse_page_args
+from utils.response_cache import summary_cache
+from utils.sales_filters import parse_sales_filters
+from utils.streaming import ndjson_response, wants_ndjson
+from utils.upload_formats import UploadFormatError
+
+COMMISSION_JOB_WORKERS = int(os.environ.get("COMMISSION_JOB_WORKERS", 2))
+MAX_IDEMPOTENCY_KEY_LENGTH = 255
 
 app = Blueprint('sales', __name__)
+commission_jobs = CommissionJobRunner(
+    SessionLocal,
+    max_workers=COMMISSION_JOB_WORKERS,
+    serialize_writes=engine.dialect.name == 'sqlite'
+)
+
+@app.record_once
+def register_session_teardown(state):
+    install_session_teardown(state.app)
+
+@app.record_once
+def register_instrumentation(state):
+    instrument_app(state.app)
+    install_profiler(state.app)
+
+def wants_async(request) -> bool:
+    return request.args.get('async') == '1' or 'respond-async' in request.headers.get('Prefer', '')
+
+def upload_stats_headers(response, stats: dict):
+    response.headers['X-Rows-Inserted'] = str(stats['rows_saved'])
+    response.headers['X-Rows-Skipped'] = str(stats['rows_skipped'])
+    if stats.get('replayed'):
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+def cached_json_response(build):
+    key = (request.path, tuple(sorted(request.args.items(multi=True))))
+    # Read the version before building, so a result that raced with a write
+    # is stored under the older version and rebuilt on the next request.
+    version = data_version.version
+    entry = summary_cache.get(key, version)
+    if entry is None:
+        payload = build()
+        if payload is None:
+            return None
+        with phase('serialize'):
+            body = jsonify(payload).get_data()
+        entry = summary_cache.put(key, version, body)
+    response = current_app.response_class(entry['body'], mimetype='application/json')
+    response.set_etag(entry['etag'])
+    response.last_modified = entry['last_modified']
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
 
 @app.route('/commissions/calculate', methods=['POST'])
 def calculate_commissions():
-    db = SessionLocal()
+    db = get_db()
     service = SaleService(db)
-    if 'file' not in request.files:
+    with phase('receive'):
+        files = request.files
+    if 'file' not in files:
         return 'No file part', 400
-    file = request.files['file']
+    file = files['file']
     if file.filename == '':
         return 'No selected file', 400
+    idempotency_key = request.headers.get('Idempotency-Key') or None
+    if idempotency_key and len(idempotency_key) > MAX_IDEMPOTENCY_KEY_LENGTH:
+        return make_response(jsonify({"error": "Idempotency-Key is too long"}), 400)
     if file:
-        file_path = "/tmp/" + file.filename
-        file.save(file_path)
-        commissions = service.calculate_commissions(file_path)
-        return jsonify(commissions)
+        if wants_async(request):
+            # The job outlives the request and its upload stream, so it gets its
+            # own copy, which it removes when it finishes.
+            file_descriptor, file_path = tempfile.mkstemp(prefix='commissions-')
+            os.close(file_descriptor)
+            file.save(file_path)
+            job = commission_jobs.submit(file_path, idempotency_key=idempotency_key, content_type=file.mimetype)
+            response = make_response(jsonify(job), 202)
+            response.headers['Location'] = url_for('.get_job', job_id=job['id'])
+            return response
+        stats = {}
+        try:
+            commissions = service.calculate_commissions(
+                file.stream, stats=stats, idempotency_key=idempotency_key, content_type=file.mimetype
+            )
+        except UploadFormatError as error:
+            return make_response(jsonify({"error": str(error)}), 415)
+        add_rows(stats)
+        with phase('serialize'):
+            response = jsonify(commissions)
+        return upload_stats_headers(response, stats)
+
+@app.route('/jobs/<string:job_id>', methods=['GET'])
+def get_job(job_id):
+    job = commission_jobs.get(job_id)
+    if job is None:
+        return make_response(jsonify({"error": "Job not found"}), 404)
+    return jsonify(job)
 
 @app.route('/sales/summary', methods=['GET'])
 def get_sales_summary():
-    db = SessionLocal()
-    service = SaleService(db)
-    summary = service.get_sales_summary()
-    return jsonify(summary)
+    try:
+        filters = parse_sales_filters(request.args)
+    except ValueError as error:
+        return make_response(jsonify({"error": str(error)}), 400)
+    return cached_json_response(lambda: SaleService(get_db()).get_sales_summary(filters))
 
 @app.route('/sales/<string:seller_cpf>', methods=['GET'])
 def get_sales_by_seller(seller_cpf):
-    db = SessionLocal()
+    db = get_db()
     service = SaleService(db)
+    if wants_ndjson(request):
+        sales = service.iter_sales_by_seller(seller_cpf)
+        if sales is None:
+            return make_response(jsonify({"error": "Seller not found"}), 404)
+        return ndjson_response(sales, detach_db())
+    try:
+        page = parse_page_args(request.args)
+        if page:
+            sales = service.get_sales_page_by_seller(seller_cpf, *page)
+            if sales is None:
+                return make_response(jsonify({"error": "Seller not found"}), 404)
+            return jsonify(sales)
+    except ValueError as error:
+        return make_response(jsonify({"error": str(error)}), 400)
     sales = service.get_sales_by_seller(seller_cpf)
     if not sales:
         return make_response(jsonify({"error": "Seller not found"}), 404)
-    return jsonify(sales)
+    with phase('serialize'):
+        return jsonify(sales)
 
 @app.route('/sales/summary/<string:seller_cpf>', methods=['GET'])
 def get_summary_by_seller(seller_cpf):
-    db = SessionLocal()
-    service = SaleService(db)
-    summary = service.get_summary_by_seller(seller_cpf)
-    if not summary:
+    try:
+        filters = parse_sales_filters(request.args)
+    except ValueError as error:
+        return make_response(jsonify({"error": str(error)}), 400)
+    response = cached_json_response(lambda: SaleService(get_db()).get_summary_by_seller(seller_cpf, filters))
+    if response is None:
         return make_response(jsonify({"error": "Seller not found"}), 404)
-    return jsonify(summary)
\ No newline at end of file
+    return response
\ No newline at end of file
@@ -1,12 +1,26 @@
 from flask import Blueprint, request, jsonify, abort, make_response
-from database.database import SessionLocal
+from database.database import detach_db, get_db, install_session_teardown
 from services.seller_service import SellerService
+from utils.instrumentation import add_rows, instrument_app, phase
+from utils.profiling import install_profiler
+from utils.pagination import parse_page_args
+from utils.streaming import ndjson_response, wants_ndjson
+from utils.upload_formats import UploadFormatError
 
 app = Blueprint('sellers', __name__)
 
+@app.record_once
+def register_session_teardown(state):
+    install_session_teardown(state.app)
+
+@app.record_once
+def register_instrumentation(state):
+    instrument_app(state.app)
+    install_profiler(state.app)
+
 @app.route('/sellers/<int:id>', methods=['GET'])
 def get_seller(id):
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
     seller = service.get_seller(id)
     if seller is None:
@@ -15,7 +29,7 @@ def get_seller(id):
 
 @app.route('/sellers/cpf/<cpf>', methods=['GET'])
 def get_seller_by_cpf(cpf):
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
     seller = service.get_seller_by_cpf(cpf)
     if seller is None:
@@ -24,7 +38,7 @@ def get_seller_by_cpf(cpf):
 
 @app.route('/sellers', methods=['POST'])
 def create_seller():
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
     data = request.json
 
@@ -46,7 +60,7 @@ def create_seller():
 
 @app.route('/sellers/<int:id>', methods=['PUT'])
 def update_seller(id):
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
     data = request.json
 
@@ -62,28 +76,43 @@ def update_seller(id):
 
 @app.route('/sellers/<int:id>', methods=['DELETE'])
 def delete_seller(id):
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
-    success = service.delete_seller(id)
-    if not success:
+    result = service.delete_seller(id)
+    if not result:
         return make_response(jsonify({"error": "Seller not found"}), 404)
+    if isinstance(result, dict):
+        return make_response(jsonify(result), 409)
     return '', 204
 
 @app.route('/sellers', methods=['GET'])
 def get_all_sellers():
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
+    if wants_ndjson(request):
+        return ndjson_response(service.iter_all_sellers(), detach_db())
+    try:
+        page = parse_page_args(request.args)
+        if page:
+            return jsonify(service.get_sellers_page(*page))
+    except ValueError as error:
+        return make_response(jsonify({"error": str(error)}), 400)
     sellers = service.get_all_sellers()
-    return jsonify(sellers)
+    with phase('serialize'):
+        return jsonify(sellers)
 
 @app.route('/sellers/load', methods=['POST'])
 def load_sellers():
-    db = SessionLocal()
+    db = get_db()
     service = SellerService(db)
-    file = request.files['file']
-    file_path = "/tmp/" + file.filename
-    file.save(file_path)
-    result = service.load_sellers_from_csv(file_path)
+    with phase('receive'):
+        file = request.files['file']
+    stats = {}
+    try:
+        result = service.load_sellers_from_csv(file.stream, stats=stats, content_type=file.mimetype)
+    except UploadFormatError as error:
+        return make_response(jsonify({"error": str(error)}), 415)
+    add_rows(stats)
     if 'errors' in result:
         return make_response(jsonify(result), 400)
     return jsonify(result)
@@ -0,0 +1,47 @@
+import csv
+import io
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+COPY_DRIVERS = {'psycopg2', 'psycopg'}
+
+
+def supports_copy(db: Session) -> bool:
+    dialect = db.get_bind().dialect
+    return dialect.name == 'postgresql' and dialect.driver in COPY_DRIVERS
+
+
+UPSERT_INSERTS = {
+    'postgresql': postgresql.insert,
+    'sqlite': sqlite.insert
+}
+
+
+def upsert_insert(db: Session, table):
+    # The backend is checked once, when the engine is created.
+    return UPSERT_INSERTS[db.get_bind().dialect.name](table)
+
+
+def rows_to_csv(rows, columns) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    for row in rows:
+        writer.writerow([row[column] for column in columns])
+    return buffer.getvalue()
+
+
+def copy_rows(db: Session, table_name: str, columns, rows):
+    preparer = db.get_bind().dialect.identifier_preparer
+    statement = "COPY {} ({}) FROM STDIN WITH (FORMAT csv)".format(
+        preparer.quote(table_name),
+        ', '.join(preparer.quote(column) for column in columns)
+    )
+    data = rows_to_csv(rows, columns)
+    # Run on the session's own connection so the COPY joins its transaction.
+    connection = db.connection().connection.driver_connection
+    with connection.cursor() as cursor:
+        if hasattr(cursor, 'copy_expert'):
+            cursor.copy_expert(statement, io.StringIO(data))
+        else:
+            with cursor.copy(statement) as copy:
+                copy.write(data)
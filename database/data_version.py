@@ -0,0 +1,44 @@
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import event
+
+
+class DataVersion:
+    def __init__(self):
+        self.version = 0
+        self.changed_at = datetime.now(timezone.utc)
+        self.lock = threading.Lock()
+
+    def bump(self):
+        with self.lock:
+            self.version += 1
+            self.changed_at = datetime.now(timezone.utc)
+
+    def track(self, session_factory, metadata):
+        @event.listens_for(metadata, 'after_create')
+        @event.listens_for(metadata, 'after_drop')
+        def bump_on_schema_change(target, connection, **kw):
+            self.bump()
+
+        @event.listens_for(session_factory, 'after_flush')
+        def mark_flush(session, flush_context):
+            session.info['data_changed'] = True
+
+        @event.listens_for(session_factory, 'do_orm_execute')
+        def mark_execute(orm_execute_state):
+            if not orm_execute_state.is_select:
+                orm_execute_state.session.info['data_changed'] = True
+
+        # Bumping only after the commit went through means a reader that sees
+        # the new version also sees the new rows.
+        @event.listens_for(session_factory, 'after_commit')
+        def bump_on_commit(session):
+            if session.info.pop('data_changed', False):
+                self.bump()
+
+        @event.listens_for(session_factory, 'after_rollback')
+        def reset_on_rollback(session):
+            session.info.pop('data_changed', None)
+
+
+data_version = DataVersion()
@@ -1,12 +1,119 @@
-from sqlalchemy import create_engine
+import os
+from flask import g
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from database.bulk import UPSERT_INSERTS
+from database.data_version import data_version
+from utils.instrumentation import instrument_engine
 
 Base = declarative_base()
 
-DATABASE_URL = "sqlite:///sellers.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///sellers.db")
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 30))
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "performance")
+
+SQLITE_PROFILES = {
+    # SQLite defaults: rollback journal, a writer blocks readers at commit.
+    # WAL is stored in the database file, so it is switched back explicitly.
+    'default': {
+        'journal_mode': 'DELETE',
+        'synchronous': 'FULL'
+    },
+    # WAL lets readers keep going while an upload writes.
+    'performance': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -64000,
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000
+    }
+}
+
+def apply_sqlite_profile(engine, profile: str):
+    pragmas = SQLITE_PROFILES[profile]
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma, value in pragmas.items():
+            cursor.execute(f"PRAGMA {pragma}={value}")
+        cursor.close()
+
+def check_backend(url: str):
+    backend = make_url(url).get_backend_name()
+    if backend not in UPSERT_INSERTS:
+        raise ValueError(
+            f"Unsupported database backend: {backend}; DATABASE_URL must point to SQLite or PostgreSQL"
+        )
+
+def engine_options(url: str) -> dict:
+    url = make_url(url)
+    options = {"pool_pre_ping": True}
+    if url.get_backend_name() == 'sqlite':
+        options["connect_args"] = {"check_same_thread": False}
+        if url.database in (None, '', ':memory:'):
+            # In-memory databases live in a single connection and can't be pooled.
+            return options
+    options.update(
+        pool_size=POOL_SIZE,
+        max_overflow=MAX_OVERFLOW,
+        pool_recycle=POOL_RECYCLE,
+        pool_timeout=POOL_TIMEOUT
+    )
+    return options
+
+# Fail at startup rather than on the first bulk write.
+check_backend(DATABASE_URL)
+engine = create_engine(DATABASE_URL, **engine_options(DATABASE_URL))
+if engine.dialect.name == 'sqlite':
+    apply_sqlite_profile(engine, SQLITE_PROFILE)
+instrument_engine(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+data_version.track(SessionLocal, Base.metadata)
 
 def init_db():
+    from database.migrations import run_migrations
+
     Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+def get_db():
+    if 'db' not in g:
+        g.db = SessionLocal()
+    return g.db
+
+def detach_db():
+    return g.pop('db', None)
+
+def close_db(exception=None):
+    db = g.pop('db', None)
+    if db is None:
+        return
+    if exception is not None:
+        db.rollback()
+    db.close()
+
+def install_session_teardown(app):
+    if 'database' in app.extensions:
+        return
+    app.extensions['database'] = SessionLocal
+    app.teardown_appcontext(close_db)
+
+def get_pool_metrics():
+    pool = engine.pool
+    return {
+        'pool_class': type(pool).__name__,
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+        'max_overflow': MAX_OVERFLOW,
+        'recycle': POOL_RECYCLE,
+        'timeout': POOL_TIMEOUT
+    }
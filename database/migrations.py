@@ -0,0 +1,116 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, bindparam, inspect, select, text
+from sqlalchemy.orm import Session
+import pandas as pd
+
+metadata = MetaData()
+
+ACCESS_PATH_INDEXES = {'ix_sales_seller_cpf_date', 'ix_sales_date', 'ix_sales_channel', 'ix_sales_client_type'}
+ROW_HASH_BATCH_SIZE = 5000
+
+schema_migrations = Table(
+    'schema_migrations',
+    metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String, nullable=False),
+    Column('applied_at', DateTime, nullable=False)
+)
+
+
+def create_sales_indexes(db: Session):
+    from models.sale import Sale
+
+    for index in Sale.__table__.indexes:
+        if index.name in ACCESS_PATH_INDEXES:
+            index.create(bind=db.connection(), checkfirst=True)
+
+
+def backfill_sales_aggregates(db: Session):
+    from services.sale_service import SaleService
+
+    SaleService(db).rebuild_sales_aggregates()
+
+
+def add_sales_row_hash(db: Session):
+    from models.sale import Sale
+
+    columns = {column['name'] for column in inspect(db.connection()).get_columns('sales')}
+    if 'row_hash' not in columns:
+        db.execute(text("ALTER TABLE sales ADD COLUMN row_hash VARCHAR(32)"))
+    unique_index = next(index for index in Sale.__table__.indexes if index.name == 'ux_sales_row_hash')
+    unique_index.create(bind=db.connection(), checkfirst=True)
+
+
+def cascade_sales_seller_key(db: Session):
+    connection = db.connection()
+    # SQLite doesn't enforce the key, and the repositories move sales and
+    # refuse to delete sellers who have any, so only PostgreSQL needs the
+    # constraint rebuilt. Sales are never deleted with their seller.
+    if connection.dialect.name != 'postgresql':
+        return
+    for foreign_key in inspect(connection).get_foreign_keys('sales'):
+        if foreign_key['referred_table'] == 'sellers':
+            db.execute(text(f'ALTER TABLE sales DROP CONSTRAINT "{foreign_key["name"]}"'))
+    db.execute(text(
+        "ALTER TABLE sales ADD CONSTRAINT sales_seller_cpf_fkey FOREIGN KEY (seller_cpf) "
+        "REFERENCES sellers (cpf) ON UPDATE CASCADE"
+    ))
+
+
+def rehash_sales_rows(db: Session):
+    from models.sale import Sale
+    from utils.row_hash import ROW_HASH_FIELDS, SaleRowHasher
+
+    table = Sale.__table__
+    fields = [table.c[field] for field in ROW_HASH_FIELDS]
+    set_hash = table.update().where(table.c.id == bindparam('sale_id')).values(row_hash=bindparam('hash'))
+    # Every stored sale is hashed again in id order, the order it was
+    # uploaded in, so sales stored twice get numbered copies like new uploads
+    # do, and hashes from before the numbering are replaced.
+    db.execute(table.update().values(row_hash=None))
+    hasher = SaleRowHasher()
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(table.c.id, *fields)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(ROW_HASH_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        sales = pd.DataFrame(rows, columns=['id', *ROW_HASH_FIELDS])
+        updates = [{'sale_id': sale_id, 'hash': row_hash} for sale_id, row_hash in zip(sales['id'].tolist(), hasher.hash(sales))]
+        db.execute(set_hash, updates)
+
+
+MIGRATIONS = [
+    (1, "Create sales access path indexes", create_sales_indexes),
+    (2, "Backfill sales aggregate tables", backfill_sales_aggregates),
+    (3, "Add sales row hash for deduplicated ingestion", add_sales_row_hash),
+    (4, "Cascade seller CPF changes to sales", cascade_sales_seller_key),
+    (5, "Number identical sales in the row hash", rehash_sales_rows),
+    # Databases that applied version 4 while it also cascaded deletes get
+    # the key rebuilt without it.
+    (6, "Stop cascading seller deletes to sales", cascade_sales_seller_key),
+]
+
+
+def run_migrations(engine):
+    metadata.create_all(bind=engine)
+    applied_versions = []
+    with Session(engine) as db:
+        applied = set(db.execute(select(schema_migrations.c.version)).scalars())
+        for version, description, migrate in MIGRATIONS:
+            if version in applied:
+                continue
+            migrate(db)
+            db.execute(schema_migrations.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.now()
+            ))
+            db.commit()
+            applied_versions.append(version)
+    return applied_versions
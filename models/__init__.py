@@ -1,4 +1,6 @@
 from .seller import Seller
 from .sale import Sale
+from .sales_aggregate import SalesAggregate
+from .upload_receipt import UploadReceipt
 
-__all__ = ["Seller", "Sale", "Base"]
+__all__ = ["Seller", "Sale", "SalesAggregate", "UploadReceipt", "Base"]
@@ -1,17 +1,27 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from database.database import Base 
 from datetime import datetime
 
 class Sale(Base):
     __tablename__ = 'sales'
+    __table_args__ = (
+        Index('ix_sales_seller_cpf_date', 'seller_cpf', 'date'),
+        Index('ix_sales_date', 'date'),
+        Index('ix_sales_channel', 'channel'),
+        Index('ix_sales_client_type', 'client_type'),
+        Index('ux_sales_row_hash', 'row_hash', unique=True),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
-    seller_cpf = Column(String, ForeignKey('sellers.cpf'), nullable=False)
+    seller_cpf = Column(String, ForeignKey('sellers.cpf', onupdate='CASCADE'), nullable=False)
     value = Column(Float, nullable=False)
     channel = Column(String, nullable=False)
     commission = Column(Float, nullable=False)
     date = Column(DateTime, nullable=False)
     client_type = Column(String, nullable=False)
     currency = Column(String, nullable=False)
+    # Content hash used to skip sales that were already ingested.
+    row_hash = Column(String(32))
 
     seller = relationship('Seller')
\ No newline at end of file
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, Float
+from database.database import Base
+
+class SalesAggregate(Base):
+    __tablename__ = 'sales_aggregates'
+
+    dimension = Column(String, primary_key=True)
+    key = Column(String, primary_key=True)
+    total_value = Column(Float, nullable=False, default=0)
+    total_commission = Column(Float, nullable=False, default=0)
+    count = Column(Integer, nullable=False, default=0)
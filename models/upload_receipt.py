@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Integer, JSON, String
+from database.database import Base
+from datetime import datetime
+
+class UploadReceipt(Base):
+    __tablename__ = 'upload_receipts'
+
+    key = Column(String, primary_key=True)
+    result = Column(JSON, nullable=False)
+    rows_read = Column(Integer, nullable=False, default=0)
+    rows_saved = Column(Integer, nullable=False, default=0)
+    rows_skipped = Column(Integer, nullable=False, default=0)
+    rows_rejected = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
@@ -1,24 +1,123 @@
+from sqlalchemy import and_, func, or_, text
 from sqlalchemy.orm import Session
+from database.bulk import copy_rows, supports_copy, upsert_insert
 from models.sale import Sale
 from models.seller import Seller
+from repositories.sales_aggregate_repository import SalesAggregateRepository
+from repositories.seller_repository import IN_CLAUSE_CHUNK_SIZE
+from utils.row_hash import SaleRowHasher
+import pandas as pd
+
+BULK_INSERT_BATCH_SIZE = 5000
+SUMMARY_DIMENSIONS = {
+    'channel': Sale.channel,
+    'state': Seller.state,
+    'client_type': Sale.client_type,
+    'seller': Sale.seller_cpf
+}
+SALES_FILTERS = {
+    'channel': Sale.channel,
+    'state': Seller.state,
+    'client_type': Sale.client_type,
+    'currency': Sale.currency
+}
+SALE_FIELDS = ['seller_cpf', 'value', 'channel', 'commission', 'date', 'client_type', 'currency']
+INSERT_FIELDS = SALE_FIELDS + ['row_hash']
+
+
+def sale_frame(sales) -> pd.DataFrame:
+    if not isinstance(sales, pd.DataFrame):
+        sales = pd.DataFrame(list(sales), columns=INSERT_FIELDS)
+    given = sales['row_hash'] if 'row_hash' in sales else None
+    if given is None or given.isna().any():
+        row_hashes = pd.Series(SaleRowHasher().hash(sales), index=sales.index, dtype=object)
+        sales = sales.assign(row_hash=row_hashes if given is None else given.fillna(row_hashes))
+    return sales
+
+
+def sale_parameters(sales: pd.DataFrame) -> list:
+    # Each column is converted to Python values once and the rows are zipped
+    # from those lists, rather than boxing the frame cell by cell.
+    columns = [
+        list(sales[field].dt.to_pydatetime()) if field == 'date' else sales[field].tolist()
+        for field in INSERT_FIELDS
+    ]
+    return [dict(zip(INSERT_FIELDS, row)) for row in zip(*columns)]
+
+
+def filter_sales(query, filters):
+    if not filters:
+        return query
+    if 'date_from' in filters:
+        query = query.filter(Sale.date >= filters['date_from'])
+    if 'date_before' in filters:
+        query = query.filter(Sale.date < filters['date_before'])
+    for name, column in SALES_FILTERS.items():
+        if name in filters:
+            query = query.filter(column == filters[name])
+    return query
+
 
 class SaleRepository:
     def __init__(self, db: Session):
         self.db = db
+        self.aggregate_repository = SalesAggregateRepository(db)
 
     def save_sale(self, sale_data):
-        sale = Sale(
-            seller_cpf=sale_data['seller_cpf'],
-            value=sale_data['value'],
-            channel=sale_data['channel'],
-            commission=sale_data['commission'],
-            date=sale_data['date'],
-            client_type=sale_data['client_type'],
-            currency=sale_data['currency']
-        )
-        self.db.add(sale)
+        return self.save_sales_bulk([sale_data])
+
+    def save_sales_bulk(self, sales, batch_size: int = BULK_INSERT_BATCH_SIZE, commit: bool = True):
+        return len(self.insert_sales(sales, batch_size, commit))
+
+    def insert_sales(self, sales, batch_size: int = BULK_INSERT_BATCH_SIZE, commit: bool = True,
+                     states: dict = None) -> set:
+        sales = sale_frame(sales)
+        parameters = sale_parameters(sales)
+        inserted = set()
+        use_copy = supports_copy(self.db)
+        try:
+            for start in range(0, len(parameters), batch_size):
+                batch = parameters[start:start + batch_size]
+                if use_copy:
+                    inserted.update(self.copy_insert_sales(batch))
+                else:
+                    inserted.update(self.db.execute(self.insert_new_sales_statement(), batch).scalars())
+            # Sales whose row hash is already stored are skipped, and only the
+            # rows actually inserted reach the aggregates, in one update per call.
+            new_sales = sales[sales['row_hash'].isin(inserted) & ~sales['row_hash'].duplicated()]
+            if len(new_sales):
+                self.aggregate_repository.add_sales(new_sales, states)
+            if commit:
+                self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        return inserted
+
+    def insert_new_sales_statement(self):
+        table = Sale.__table__
+        statement = upsert_insert(self.db, table)
+        return statement.on_conflict_do_nothing(index_elements=[table.c.row_hash]).returning(table.c.row_hash)
+
+    def copy_insert_sales(self, sales: list) -> set:
+        columns = ', '.join(INSERT_FIELDS)
+        self.db.execute(text(
+            f"CREATE TEMP TABLE IF NOT EXISTS sales_load ON COMMIT DROP AS SELECT {columns} FROM sales WITH NO DATA"
+        ))
+        self.db.execute(text("TRUNCATE sales_load"))
+        copy_rows(self.db, 'sales_load', INSERT_FIELDS, sales)
+        rows = self.db.execute(text(
+            f"INSERT INTO sales ({columns}) SELECT {columns} FROM sales_load "
+            f"ON CONFLICT (row_hash) DO NOTHING RETURNING row_hash"
+        ))
+        return set(rows.scalars())
+
+    def commit(self):
         self.db.commit()
 
+    def rollback(self):
+        self.db.rollback()
+
     def get_sales_summary(self):
         sales_summary = self.db.query(
             Sale.seller_cpf,
@@ -31,5 +130,51 @@ class SaleRepository:
 
         return sales_summary
 
-    def get_sales_by_seller(self, seller_cpf):
-        return self.db.query(Sale).filter(Sale.seller_cpf == seller_cpf).all()
+    def get_sales_totals_by(self, dimension: str, filters: dict = None):
+        column = SUMMARY_DIMENSIONS[dimension]
+        query = self.db.query(
+            column,
+            func.sum(Sale.value),
+            func.sum(Sale.commission),
+            func.count(Sale.id)
+        ).join(Seller, Sale.seller_cpf == Seller.cpf)
+        return filter_sales(query, filters).group_by(column).all()
+
+    def get_seller_sales_totals(self, seller_cpf, filters: dict = None):
+        query = self.db.query(
+            func.coalesce(func.sum(Sale.value), 0),
+            func.coalesce(func.sum(Sale.commission), 0),
+            func.count(Sale.id)
+        ).filter(Sale.seller_cpf == seller_cpf)
+        return self.filter_seller_sales(query, filters).one()
+
+    def get_cpfs_with_sales(self, cpfs) -> set:
+        cpfs = list(dict.fromkeys(cpfs))
+        found = set()
+        for start in range(0, len(cpfs), IN_CLAUSE_CHUNK_SIZE):
+            chunk = cpfs[start:start + IN_CLAUSE_CHUNK_SIZE]
+            rows = self.db.query(Sale.seller_cpf).filter(Sale.seller_cpf.in_(chunk)).distinct().all()
+            found.update(cpf for cpf, in rows)
+        return found
+
+    def get_sales_by_seller(self, seller_cpf, filters: dict = None):
+        query = self.db.query(Sale).filter(Sale.seller_cpf == seller_cpf)
+        return self.filter_seller_sales(query, filters).all()
+
+    def filter_seller_sales(self, query, filters):
+        if filters and 'state' in filters:
+            query = query.join(Seller, Sale.seller_cpf == Seller.cpf)
+        return filter_sales(query, filters)
+
+    def iter_sales_by_seller(self, seller_cpf, batch_size: int):
+        return self.db.query(Sale).filter(Sale.seller_cpf == seller_cpf).yield_per(batch_size)
+
+    def get_sales_page_by_seller(self, seller_cpf, limit: int, after=None):
+        query = self.db.query(Sale).filter(Sale.seller_cpf == seller_cpf)
+        if after is not None:
+            after_date, after_id = after
+            query = query.filter(or_(
+                Sale.date > after_date,
+                and_(Sale.date == after_date, Sale.id > after_id)
+            ))
+        return query.order_by(Sale.date, Sale.id).limit(limit).all()
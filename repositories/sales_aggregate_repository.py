@@ -0,0 +1,123 @@
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database.bulk import upsert_insert
+from models.sale import Sale
+from models.sales_aggregate import SalesAggregate
+from repositories.seller_repository import SellerRepository
+import pandas as pd
+
+AGGREGATE_KEYS = {
+    'channel': 'channel',
+    'state': 'state',
+    'client_type': 'client_type',
+    'seller': 'seller_cpf'
+}
+
+class SalesAggregateRepository:
+    def __init__(self, db: Session):
+        self.db = db
+        self.seller_repository = SellerRepository(db)
+
+    def get_totals(self, dimension: str):
+        return self.db.query(
+            SalesAggregate.key,
+            SalesAggregate.total_value,
+            SalesAggregate.total_commission,
+            SalesAggregate.count
+        ).filter(SalesAggregate.dimension == dimension).all()
+
+    def get_seller_totals(self, cpf: str):
+        return self.db.query(
+            SalesAggregate.total_value,
+            SalesAggregate.total_commission,
+            SalesAggregate.count
+        ).filter(SalesAggregate.dimension == 'seller', SalesAggregate.key == cpf).first()
+
+    def add_sales(self, sales: pd.DataFrame, states: dict = None):
+        if states is None:
+            states = self.seller_repository.get_states_by_cpf(sales['seller_cpf'].unique())
+        sales = sales[['seller_cpf', 'value', 'commission', 'channel', 'client_type']]
+        # Summaries only count sales whose seller exists, like the joined query.
+        sales = sales.assign(state=sales['seller_cpf'].map(states))
+        sales = sales[sales['state'].notna()]
+
+        increments = []
+        for dimension, column in AGGREGATE_KEYS.items():
+            grouped = sales.groupby(column, sort=False).agg(
+                total_value=('value', 'sum'),
+                total_commission=('commission', 'sum'),
+                count=('value', 'size')
+            )
+            increments.extend(
+                {'dimension': dimension, 'key': key, 'total_value': float(total_value),
+                 'total_commission': float(total_commission), 'count': int(count)}
+                for key, total_value, total_commission, count in grouped.itertuples(name=None)
+            )
+        self.increment(increments)
+
+    def add_seller(self, cpf: str, state: str):
+        self.increment(self.seller_contributions(cpf, state))
+
+    def remove_seller(self, cpf: str, state: str):
+        self.increment(self.seller_contributions(cpf, state, sign=-1))
+
+    def move_seller_state(self, cpf: str, old_state: str, new_state: str):
+        totals = self.get_seller_totals(cpf)
+        if not totals:
+            return
+        total_value, total_commission, count = totals
+        self.increment([
+            {'dimension': 'state', 'key': old_state, 'total_value': -total_value,
+             'total_commission': -total_commission, 'count': -count},
+            {'dimension': 'state', 'key': new_state, 'total_value': total_value,
+             'total_commission': total_commission, 'count': count}
+        ])
+
+    def seller_contributions(self, cpf: str, state: str, sign: int = 1):
+        contributions = []
+        seller_totals = {'total_value': 0, 'total_commission': 0, 'count': 0}
+        for dimension, column in (('channel', Sale.channel), ('client_type', Sale.client_type)):
+            rows = self.db.query(
+                column,
+                func.sum(Sale.value),
+                func.sum(Sale.commission),
+                func.count(Sale.id)
+            ).filter(Sale.seller_cpf == cpf).group_by(column)
+            for key, total_value, total_commission, count in rows:
+                contributions.append({'dimension': dimension, 'key': key, 'total_value': sign * total_value,
+                                      'total_commission': sign * total_commission, 'count': sign * count})
+                if dimension == 'channel':
+                    seller_totals['total_value'] += sign * total_value
+                    seller_totals['total_commission'] += sign * total_commission
+                    seller_totals['count'] += sign * count
+
+        if seller_totals['count']:
+            contributions.append({'dimension': 'state', 'key': state, **seller_totals})
+            contributions.append({'dimension': 'seller', 'key': cpf, **seller_totals})
+        return contributions
+
+    def increment(self, increments):
+        if not increments:
+            return
+        table = SalesAggregate.__table__
+        statement = upsert_insert(self.db, table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.dimension, table.c.key],
+            set_={
+                'total_value': table.c.total_value + statement.excluded.total_value,
+                'total_commission': table.c.total_commission + statement.excluded.total_commission,
+                'count': table.c.count + statement.excluded.count
+            }
+        )
+        self.db.execute(statement, increments)
+        self.db.query(SalesAggregate).filter(SalesAggregate.count <= 0).delete(synchronize_session=False)
+
+    def replace_totals(self, dimension: str, totals):
+        self.db.query(SalesAggregate).filter(SalesAggregate.dimension == dimension).delete(synchronize_session=False)
+        rows = [
+            {'dimension': dimension, 'key': key, 'total_value': total_value,
+             'total_commission': total_commission, 'count': count}
+            for key, total_value, total_commission, count in totals
+        ]
+        if rows:
+            self.db.execute(SalesAggregate.__table__.insert(), rows)
@@ -0,0 +1,114 @@
+import os
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from models.seller import Seller
+
+SELLER_CACHE_SIZE = int(os.environ.get("SELLER_CACHE_SIZE", 10000))
+SELLER_CACHE_TTL = float(os.environ.get("SELLER_CACHE_TTL", 60))
+SELLER_COLUMNS = [column.key for column in Seller.__table__.columns]
+
+
+def detached_copy(seller: Seller) -> Seller:
+    copy = Seller(**{column: getattr(seller, column) for column in SELLER_COLUMNS})
+    make_transient_to_detached(copy)
+    return copy
+
+
+class SellerCache:
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        # One LRU per engine, so separate databases never share entries.
+        self.entries = weakref.WeakKeyDictionary()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def engine_entries(self, db: Session) -> OrderedDict:
+        bind = db.get_bind()
+        engine = getattr(bind, 'engine', bind)
+        return self.entries.setdefault(engine, OrderedDict())
+
+    def get(self, db: Session, field: str, value):
+        if self.max_size <= 0:
+            return None
+        with self.lock:
+            entries = self.engine_entries(db)
+            entry = entries.get((field, value))
+            if entry is not None and entry[0] < time.monotonic():
+                self.discard(entries, entry[1])
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entries.move_to_end((field, value))
+            self.hits += 1
+            seller = entry[1]
+        # Each request gets its own session-bound instance; the cached copy
+        # itself is never attached to a session.
+        return db.merge(seller, load=False)
+
+    def put(self, db: Session, seller: Seller):
+        if self.max_size <= 0:
+            return
+        copy = detached_copy(seller)
+        entry = (time.monotonic() + self.ttl, copy)
+        with self.lock:
+            entries = self.engine_entries(db)
+            for key in (('id', copy.id), ('cpf', copy.cpf)):
+                previous = entries.get(key)
+                if previous is not None:
+                    self.discard(entries, previous[1])
+            entries[('id', copy.id)] = entry
+            entries[('cpf', copy.cpf)] = entry
+            while len(entries) > self.max_size * 2:
+                _, (_, oldest) = entries.popitem(last=False)
+                self.discard(entries, oldest)
+                self.evictions += 1
+
+    def invalidate(self, db: Session, id: int = None, cpf: str = None):
+        with self.lock:
+            entries = self.engine_entries(db)
+            for key in (('id', id), ('cpf', cpf)):
+                entry = entries.get(key)
+                if entry is not None:
+                    self.discard(entries, entry[1])
+
+    def discard(self, entries: OrderedDict, seller: Seller):
+        entries.pop(('id', seller.id), None)
+        entries.pop(('cpf', seller.cpf), None)
+
+    def clear(self, db: Session = None):
+        with self.lock:
+            if db is None:
+                self.entries.clear()
+            else:
+                self.engine_entries(db).clear()
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                'size': sum(len(entries) for entries in self.entries.values()) // 2,
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
+
+
+seller_cache = SellerCache(SELLER_CACHE_SIZE, SELLER_CACHE_TTL)
+
+
+@event.listens_for(Seller.__table__, 'after_create')
+@event.listens_for(Seller.__table__, 'after_drop')
+def clear_seller_cache(target, connection, **kw):
+    seller_cache.clear()
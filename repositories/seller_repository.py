@@ -1,31 +1,151 @@
+from sqlalchemy import exists, text
 from sqlalchemy.orm import Session
+from database.bulk import copy_rows, supports_copy, upsert_insert
+from models.sale import Sale
 from models.seller import Seller
+from repositories.seller_cache import seller_cache
+
+# Stay below SQLite's default limit of 999 bound parameters per statement.
+IN_CLAUSE_CHUNK_SIZE = 900
+BULK_UPSERT_BATCH_SIZE = 5000
+UPSERT_COLUMNS = ['name', 'birth_date', 'email', 'state']
+LOAD_COLUMNS = ['cpf'] + UPSERT_COLUMNS
 
 class SellerRepository:
     def __init__(self, db: Session):
         self.db = db
 
     def get_seller_by_id(self, id: int):
-        return self.db.query(Seller).filter(Seller.id == id).first()
+        return self.get_cached_seller('id', id, Seller.id)
 
     def get_seller_by_cpf(self, cpf: str):
-        return self.db.query(Seller).filter(Seller.cpf == cpf).first()
+        return self.get_cached_seller('cpf', cpf, Seller.cpf)
+
+    def get_cached_seller(self, field: str, value, column):
+        seller = seller_cache.get(self.db, field, value)
+        if seller is None:
+            # Only sellers that exist are cached, so a seller created elsewhere
+            # is found on its first lookup.
+            seller = self.db.query(Seller).filter(column == value).first()
+            if seller:
+                seller_cache.put(self.db, seller)
+        return seller
+
+    def get_seller_for_update(self, id: int):
+        # Writes start from the stored row, never from a cached copy, which can
+        # be stale or outdated by another process; populate_existing also
+        # overwrites a cached copy already merged into this session.
+        return self.db.query(Seller).filter(Seller.id == id).populate_existing().with_for_update().first()
+
+    def get_existing_cpfs(self, cpfs) -> set:
+        cpfs = list(dict.fromkeys(cpf for cpf in cpfs if isinstance(cpf, str)))
+        existing = set()
+        for start in range(0, len(cpfs), IN_CLAUSE_CHUNK_SIZE):
+            chunk = cpfs[start:start + IN_CLAUSE_CHUNK_SIZE]
+            rows = self.db.query(Seller.cpf).filter(Seller.cpf.in_(chunk)).all()
+            existing.update(cpf for cpf, in rows)
+        return existing
+
+    def get_all_cpfs(self) -> set:
+        return {cpf for cpf, in self.db.query(Seller.cpf)}
+
+    def get_states_by_cpf(self, cpfs, lock: bool = False) -> dict:
+        cpfs = list(dict.fromkeys(cpf for cpf in cpfs if isinstance(cpf, str)))
+        states = {}
+        for start in range(0, len(cpfs), IN_CLAUSE_CHUNK_SIZE):
+            chunk = cpfs[start:start + IN_CLAUSE_CHUNK_SIZE]
+            query = self.db.query(Seller.cpf, Seller.state).filter(Seller.cpf.in_(chunk))
+            if lock:
+                # FOR SHARE: the states can't change until this transaction
+                # ends. SQLite has no row locks and ignores it.
+                query = query.with_for_update(read=True)
+            states.update(query.all())
+        return states
 
     def create_seller(self, seller: Seller):
         self.db.add(seller)
         self.db.commit()
         self.db.refresh(seller)
+        seller_cache.invalidate(self.db, seller.id, seller.cpf)
         return seller
 
     def update_seller(self, seller: Seller):
-        self.db.commit()
+        try:
+            self.db.commit()
+        finally:
+            # Dropping the id entry also drops the CPF it was cached under.
+            seller_cache.invalidate(self.db, seller.id, seller.cpf)
         self.db.refresh(seller)
         return seller
 
-    def delete_seller(self, seller: Seller):
-        self.db.delete(seller)
-        self.db.commit()
-        return True
+    def upsert_sellers_bulk(self, sellers: list, batch_size: int = BULK_UPSERT_BATCH_SIZE):
+        # A single upsert statement can't touch the same CPF twice; keep the last row.
+        sellers = list({seller['cpf']: seller for seller in sellers}.values())
+        try:
+            if supports_copy(self.db):
+                self.copy_upsert_sellers(sellers, batch_size)
+            else:
+                table = Seller.__table__
+                statement = upsert_insert(self.db, table)
+                statement = statement.on_conflict_do_update(
+                    index_elements=[table.c.cpf],
+                    set_={column: statement.excluded[column] for column in UPSERT_COLUMNS}
+                )
+                for start in range(0, len(sellers), batch_size):
+                    self.db.execute(statement, sellers[start:start + batch_size])
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        finally:
+            seller_cache.clear(self.db)
+        return len(sellers)
+
+    def copy_upsert_sellers(self, sellers: list, batch_size: int):
+        columns = ', '.join(LOAD_COLUMNS)
+        updates = ', '.join(f"{column} = EXCLUDED.{column}" for column in UPSERT_COLUMNS)
+        self.db.execute(text(
+            f"CREATE TEMP TABLE sellers_load ON COMMIT DROP AS SELECT {columns} FROM sellers WITH NO DATA"
+        ))
+        for start in range(0, len(sellers), batch_size):
+            copy_rows(self.db, 'sellers_load', LOAD_COLUMNS, sellers[start:start + batch_size])
+        self.db.execute(text(
+            f"INSERT INTO sellers ({columns}) SELECT {columns} FROM sellers_load "
+            f"ON CONFLICT (cpf) DO UPDATE SET {updates}"
+        ))
+
+    def move_sales(self, old_cpf: str, new_cpf: str):
+        # The seller row is written first, so sales never point at a CPF that
+        # doesn't exist. Where the foreign key cascades, nothing is left to move.
+        self.db.flush()
+        self.db.query(Sale).filter(Sale.seller_cpf == old_cpf).update(
+            {Sale.seller_cpf: new_cpf}, synchronize_session=False
+        )
+
+    def delete_seller(self, seller: Seller) -> bool:
+        id, cpf = seller.id, seller.cpf
+        # A seller with sales is kept. Checking in the same statement leaves
+        # no gap for an upload to add a sale between the check and the delete.
+        deleted = self.db.query(Seller).filter(
+            Seller.id == id,
+            ~exists().where(Sale.seller_cpf == cpf)
+        ).delete(synchronize_session=False)
+        if deleted:
+            self.db.expunge(seller)
+        try:
+            self.db.commit()
+        finally:
+            seller_cache.invalidate(self.db, id, cpf)
+        return bool(deleted)
 
     def get_all_sellers(self):
         return self.db.query(Seller).all()
+
+    def iter_all_sellers(self, batch_size: int):
+        return self.db.query(Seller).yield_per(batch_size)
+
+    def get_sellers_page(self, limit: int, after_id: int = None):
+        query = self.db.query(Seller)
+        if after_id is not None:
+            query = query.filter(Seller.id > after_id)
+        return query.order_by(Seller.id).limit(limit).all()
@@ -0,0 +1,16 @@
+from sqlalchemy.orm import Session
+from models.upload_receipt import UploadReceipt
+
+RECEIPT_STATS = ['rows_read', 'rows_saved', 'rows_skipped', 'rows_rejected']
+
+class UploadReceiptRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def get_receipt(self, key: str):
+        return self.db.get(UploadReceipt, key)
+
+    def add_receipt(self, key: str, result, stats: dict):
+        receipt = UploadReceipt(key=key, result=result, **{name: stats[name] for name in RECEIPT_STATS})
+        self.db.add(receipt)
+        return receipt
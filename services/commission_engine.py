@@ -0,0 +1,85 @@
+import numpy as np
+import pandas as pd
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+BASE_RATE = 0.10
+ONLINE_CHANNEL = 'Online'
+ONLINE_FACTOR = 0.80
+TIER_THRESHOLD = 1000
+TIER_FACTOR = 0.90
+
+SALES_COLUMNS = {
+    'CPF': 'seller_cpf',
+    'Valor': 'value',
+    'Canal de Venda': 'channel',
+    'Data': 'date',
+    'Tipo de Cliente': 'client_type',
+    'Moeda': 'currency'
+}
+SALES_UPLOAD_TYPES = {
+    'CPF': 'string',
+    'Valor': 'float64',
+    'Canal de Venda': 'string',
+    'Data': 'timestamp[us]',
+    'Tipo de Cliente': 'string',
+    'Moeda': 'string'
+}
+SALES_UPLOAD_ZERO_PAD = {'CPF': 11}
+
+
+def compute_sale_commissions(values: pd.Series, channels: pd.Series) -> np.ndarray:
+    commissions = values.to_numpy(dtype=np.float64) * BASE_RATE
+    online = (channels == ONLINE_CHANNEL).to_numpy(dtype=bool)
+    commissions[online] *= ONLINE_FACTOR
+    return commissions
+
+
+def build_sales_frame(df: pd.DataFrame) -> pd.DataFrame:
+    sales = df[list(SALES_COLUMNS)].rename(columns=SALES_COLUMNS)
+    sales['value'] = sales['value'].astype(np.float64)
+    sales['date'] = pd.to_datetime(sales['date'], format=DATE_FORMAT)
+    sales['commission'] = compute_sale_commissions(sales['value'], sales['channel'])
+    return sales
+
+
+def split_known_sales(df: pd.DataFrame, known_cpfs) -> tuple:
+    """Split an upload chunk into sales to store and rejected rows.
+
+    A row is rejected when its seller doesn't exist or its date is missing or
+    doesn't parse, whether it came from text or a typed column. Rejected rows
+    keep the CPF and date as uploaded, and 'seller_exists' tells which it was.
+    """
+    known = df['CPF'].isin(known_cpfs)
+    dates = pd.to_datetime(df['Data'], format=DATE_FORMAT, errors='coerce')
+    valid = known & dates.notna()
+    sales = build_sales_frame(df[valid].assign(Data=dates[valid]))
+    rejected = df.loc[~valid, ['CPF', 'Data']].assign(seller_exists=known[~valid])
+    return sales, rejected
+
+
+def apply_commission_tier(totals: np.ndarray) -> np.ndarray:
+    return np.where(totals >= TIER_THRESHOLD, totals * TIER_FACTOR, totals)
+
+
+class CommissionAccumulator:
+    def __init__(self):
+        self._positions = {}
+        self._totals = np.zeros(0)
+
+    def add(self, cpfs: pd.Series, commissions: np.ndarray):
+        codes, uniques = pd.factorize(cpfs, sort=False)
+        positions = np.fromiter(
+            (self._positions.setdefault(cpf, len(self._positions)) for cpf in uniques),
+            dtype=np.intp,
+            count=len(uniques)
+        )
+        if len(self._positions) > len(self._totals):
+            self._totals = np.concatenate([self._totals, np.zeros(len(self._positions) - len(self._totals))])
+        # ufunc.at is unbuffered and applies the additions in row order, so the
+        # totals stay bit-for-bit the same as adding one sale at a time, even
+        # when the sales arrive over several chunks.
+        np.add.at(self._totals, positions[codes], commissions)
+
+    def final_commissions(self) -> dict:
+        return dict(zip(self._positions, apply_commission_tier(self._totals).tolist()))
@@ -0,0 +1,78 @@
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from services.sale_service import SaleService
+from utils.instrumentation import add_rows, track
+
+MAX_FINISHED_JOBS = 1000
+FINISHED_STATUSES = {'succeeded', 'failed'}
+
+
+class CommissionJobRunner:
+    def __init__(self, session_factory, max_workers: int, serialize_writes: bool = False):
+        self.session_factory = session_factory
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='commission-job')
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        # SQLite admits a single writer, and an upload keeps its write
+        # transaction open from its first insert until the last chunk, so jobs
+        # parse side by side but take turns writing.
+        self.write_lock = threading.Lock() if serialize_writes else None
+
+    def submit(self, file_path: str, cleanup: bool = True, idempotency_key: str = None, content_type: str = None):
+        job = {
+            'id': uuid.uuid4().hex,
+            'status': 'queued',
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'progress': {'rows_read': 0, 'rows_saved': 0, 'rows_skipped': 0, 'rows_rejected': 0},
+            'result': None,
+            'error': None
+        }
+        with self.lock:
+            self.jobs[job['id']] = job
+            self.evict_finished_jobs()
+        self.executor.submit(self.run, job, file_path, cleanup, idempotency_key, content_type)
+        return self.get(job['id'])
+
+    def get(self, job_id: str):
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None:
+                return None
+            return dict(job, progress=dict(job['progress']))
+
+    def run(self, job, file_path: str, cleanup: bool, idempotency_key: str = None, content_type: str = None):
+        db = self.session_factory()
+        updates = {'status': 'failed'}
+        try:
+            with self.lock:
+                job['status'] = 'running'
+                job['started_at'] = datetime.now().isoformat()
+            with track('commission_job'):
+                updates['result'] = SaleService(db).calculate_commissions(
+                    file_path, stats=job['progress'], idempotency_key=idempotency_key,
+                    content_type=content_type, write_lock=self.write_lock
+                )
+                add_rows(job['progress'])
+            updates['status'] = 'succeeded'
+        except Exception as error:
+            updates['error'] = str(error)
+        finally:
+            db.close()
+            if cleanup and os.path.exists(file_path):
+                os.remove(file_path)
+            with self.lock:
+                job.update(updates, finished_at=datetime.now().isoformat())
+
+    def evict_finished_jobs(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job['status'] in FINISHED_STATUSES]
+        for job_id in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def shutdown(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
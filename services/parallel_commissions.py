@@ -0,0 +1,114 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from io import BytesIO, TextIOBase
+import pandas as pd
+from services.commission_engine import split_known_sales
+
+COMMISSION_PROCESSES = int(os.environ.get("COMMISSION_PROCESSES", 1))
+COMMISSION_PARALLEL_MIN_BYTES = int(os.environ.get("COMMISSION_PARALLEL_MIN_BYTES", 64 * 1024 * 1024))
+SHARD_BYTES = 32 * 1024 * 1024
+# Forking a process that already runs request and job threads can copy held
+# locks into the child, so workers start from a fresh interpreter.
+START_METHOD = 'spawn'
+
+_known_cpfs = frozenset()
+
+
+def init_worker(known_cpfs: frozenset):
+    global _known_cpfs
+    _known_cpfs = known_cpfs
+
+
+def is_path(source) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+
+def can_shard(source) -> bool:
+    # Shards are byte ranges, so streams must be binary and seekable.
+    if is_path(source):
+        return True
+    return not isinstance(source, TextIOBase) and hasattr(source, 'seekable') and source.seekable()
+
+
+def open_source(source):
+    return open(source, 'rb') if is_path(source) else nullcontext(source)
+
+
+def source_size(source) -> int:
+    if is_path(source):
+        return os.path.getsize(source)
+    position = source.tell()
+    size = source.seek(0, os.SEEK_END)
+    source.seek(position)
+    return size
+
+
+def should_shard(source, workers: int) -> bool:
+    # Spawned workers import pandas before doing any work, which costs more
+    # than it saves on small uploads.
+    return workers > 1 and can_shard(source) and source_size(source) >= COMMISSION_PARALLEL_MIN_BYTES
+
+
+def shard_ranges(source, shard_bytes: int = SHARD_BYTES):
+    with open_source(source) as file:
+        size = file.seek(0, os.SEEK_END)
+        file.seek(0)
+        header = file.readline()
+        start = file.tell()
+        ranges = []
+        while start < size:
+            # Each shard ends on a line break outside quotes, so no row is split
+            # across shards, even one with a newline inside a quoted field.
+            # Quotes come in pairs ("" escapes one), so a break is outside
+            # quotes when the shard so far holds an even number of them.
+            block = file.read(shard_bytes)
+            quotes = block.count(b'"')
+            if not block.endswith(b'\n'):
+                quotes += file.readline().count(b'"')
+            while quotes % 2 and file.tell() < size:
+                quotes += file.readline().count(b'"')
+            ranges.append((start, file.tell()))
+            start = file.tell()
+    return header, ranges
+
+
+def parse_shard(data: bytes):
+    chunk = pd.read_csv(BytesIO(data), dtype={'CPF': str})
+    return split_known_sales(chunk, _known_cpfs)
+
+
+def process_shard(path: str, header: bytes, start: int, end: int):
+    with open(path, 'rb') as file:
+        file.seek(start)
+        data = file.read(end - start)
+    return parse_shard(header + data)
+
+
+def iter_sales_shards(source, known_cpfs, workers: int, shard_bytes: int = SHARD_BYTES):
+    header, ranges = shard_ranges(source, shard_bytes)
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context(START_METHOD),
+        initializer=init_worker,
+        initargs=(frozenset(known_cpfs),)
+    )
+    pending = deque()
+    try:
+        # Keep a bounded number of shards in flight and hand results back in
+        # file order, so memory stays flat and totals add up in row order.
+        for start, end in ranges:
+            if is_path(source):
+                pending.append(executor.submit(process_shard, source, header, start, end))
+            else:
+                # Workers can't reopen an upload stream, so its bytes are sent.
+                source.seek(start)
+                pending.append(executor.submit(parse_shard, header + source.read(end - start)))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
@@ -1,143 +1,267 @@
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from models.sale import Sale
-from repositories.sale_repository import SaleRepository
+from repositories.sale_repository import SUMMARY_DIMENSIONS, SaleRepository
+from repositories.sales_aggregate_repository import SalesAggregateRepository
 from repositories.seller_repository import SellerRepository
+from repositories.upload_receipt_repository import RECEIPT_STATS, UploadReceiptRepository
+from services.commission_engine import (
+    SALES_UPLOAD_TYPES, SALES_UPLOAD_ZERO_PAD, CommissionAccumulator, split_known_sales
+)
+from services.parallel_commissions import COMMISSION_PROCESSES, iter_sales_shards, should_shard
+from utils.instrumentation import phase, timed
+from utils.pagination import cursor_values, encode_cursor
+from utils.row_hash import SaleRowHasher
+from utils.streaming import STREAM_BATCH_SIZE
+from utils.upload_formats import CSV, detect_format, iter_columnar_frames
 from datetime import datetime
+import math
+import os
 import pandas as pd
 
+SALES_CHUNK_SIZE = 100_000
+MAX_REPORTED_ERRORS = int(os.environ.get("MAX_REPORTED_ERRORS", 1000))
+
+
+def rejection_message(cpf, date, seller_exists: bool) -> str:
+    if not seller_exists:
+        return f"Seller with CPF {cpf} does not exist for sale on {date}."
+    if pd.isna(date):
+        return f"Sale for seller with CPF {cpf} has no date."
+    return f"Sale for seller with CPF {cpf} has an invalid date: {date}."
+
+
+def totals_match(expected, stored):
+    if expected is None or stored is None:
+        return expected == stored
+    return (
+        expected[2] == stored[2]
+        and math.isclose(expected[0], stored[0], rel_tol=1e-9, abs_tol=1e-6)
+        and math.isclose(expected[1], stored[1], rel_tol=1e-9, abs_tol=1e-6)
+    )
+
+
+class WriteTurn:
+    """Takes an optional lock at the first write and holds it until released."""
+
+    def __init__(self, lock=None):
+        self.lock = lock
+        self.held = False
+
+    def take(self):
+        if self.lock is not None and not self.held:
+            self.lock.acquire()
+            self.held = True
+
+    def release(self):
+        if self.held:
+            self.held = False
+            self.lock.release()
+
+
 class SaleService:
     def __init__(self, db: Session):
         self.sale_repository = SaleRepository(db)
         self.seller_repository = SellerRepository(db)
+        self.aggregate_repository = SalesAggregateRepository(db)
+        self.receipt_repository = UploadReceiptRepository(db)
 
-    def calculate_commissions(self, sales_file_path: str):
-        df = pd.read_csv(sales_file_path, dtype={'CPF': str})
-        commissions = {}
-        sales = []
+    def calculate_commissions(self, sales_file, chunksize: int = SALES_CHUNK_SIZE, stats: dict = None,
+                              workers: int = COMMISSION_PROCESSES, idempotency_key: str = None,
+                              content_type: str = None, write_lock=None):
+        stats = stats if stats is not None else {}
+        stats.update(rows_read=0, rows_saved=0, rows_skipped=0, rows_rejected=0)
+        if idempotency_key:
+            receipt = self.receipt_repository.get_receipt(idempotency_key)
+            if receipt:
+                return self.replay_receipt(receipt, stats)
+
+        accumulator = CommissionAccumulator()
+        hasher = SaleRowHasher()
+        seller_states = {}
+        states_pinned = False
         errors = []
+        file_format = detect_format(sales_file, content_type)
+        # Parsing and validation don't need the lock; once the first chunk is
+        # written the transaction stays open, so the turn lasts until the commit.
+        write_turn = WriteTurn(write_lock)
+
+        try:
+            for sales, rejected in self.iter_validated_sales(sales_file, chunksize, workers, file_format, seller_states):
+                # Only the first messages are kept, so memory stays bounded however
+                # many rows are rejected; rows_rejected carries the full count.
+                room = MAX_REPORTED_ERRORS - len(errors)
+                errors.extend(map(
+                    rejection_message,
+                    rejected['CPF'][:room], rejected['Data'][:room], rejected['seller_exists'][:room]
+                ))
+
+                with phase('compute'):
+                    # Hashes number identical sales across chunks, so they are
+                    # taken here, in file order, rather than in the workers.
+                    sales['row_hash'] = hasher.hash(sales)
+                with phase('persist'):
+                    write_turn.take()
+                    # PostgreSQL validation reads the states FOR SHARE. SQLite
+                    # can't lock them, but once this upload has written a row it
+                    # holds the write lock and no seller can change until it
+                    # commits; until then the aggregates look the states up
+                    # after inserting, and those read so far are read again.
+                    inserted = self.sale_repository.insert_sales(
+                        sales, commit=False, states=seller_states if states_pinned else None
+                    )
+                    if inserted and not states_pinned:
+                        seller_states.update(self.seller_repository.get_states_by_cpf(list(seller_states), lock=True))
+                        states_pinned = True
+                with phase('compute'):
+                    # Sales already stored by an earlier upload are left out, so
+                    # the commissions cover only what this upload added.
+                    stored = sales[sales['row_hash'].isin(inserted)]
+                    accumulator.add(stored['seller_cpf'], stored['commission'].to_numpy())
+                stats['rows_read'] += len(sales) + len(rejected)
+                stats['rows_saved'] += len(stored)
+                stats['rows_skipped'] += len(sales) - len(stored)
+                stats['rows_rejected'] += len(rejected)
+
+            with phase('compute'):
+                final_commissions = accumulator.final_commissions()
+            result = final_commissions
+            if stats['rows_rejected']:
+                result = {'errors': errors, 'commissions': final_commissions}
+                if stats['rows_rejected'] > len(errors):
+                    result['errors_omitted'] = stats['rows_rejected'] - len(errors)
+            with phase('persist'):
+                write_turn.take()
+                if idempotency_key:
+                    # The receipt commits with the sales, so a key is only ever
+                    # recorded for an upload that was fully stored.
+                    self.receipt_repository.add_receipt(idempotency_key, result, stats)
+                self.sale_repository.commit()
+        except IntegrityError:
+            self.sale_repository.rollback()
+            receipt = idempotency_key and self.receipt_repository.get_receipt(idempotency_key)
+            if not receipt:
+                raise
+            # Another request stored the same key first.
+            return self.replay_receipt(receipt, stats)
+        except Exception:
+            self.sale_repository.rollback()
+            raise
+        finally:
+            write_turn.release()
+        return result
+
+    def replay_receipt(self, receipt, stats: dict):
+        stats.update({name: getattr(receipt, name) for name in RECEIPT_STATS}, replayed=True)
+        return receipt.result
+
+    def iter_validated_sales(self, sales_file, chunksize: int, workers: int, file_format: str = CSV,
+                             seller_states: dict = None):
+        # The state of each seller found is kept in seller_states, so the
+        # aggregates reuse it instead of looking the sellers up again.
+        seller_states = seller_states if seller_states is not None else {}
+        checked_cpfs = set()
+        if file_format == CSV and should_shard(sales_file, workers):
+            # Worker processes parse and validate byte-range shards of the upload;
+            # the shards come back in file order, so the commissions match the
+            # serial path exactly. Waiting on them is reported as compute.
+            with phase('validate'):
+                known_cpfs = self.seller_repository.get_all_cpfs()
+            for sales, rejected in timed(iter_sales_shards(sales_file, known_cpfs, workers), 'compute'):
+                with phase('validate'):
+                    self.read_seller_states(sales['seller_cpf'].unique(), seller_states, checked_cpfs)
+                yield sales, rejected
+            return
 
-        for _, row in df.iterrows():
-            cpf = row['CPF']
-            seller = self.seller_repository.get_seller_by_cpf(cpf)
-            if not seller:
-                errors.append(f"Seller with CPF {cpf} does not exist for sale on {row['Data']}.")
-                continue
-
-            value = float(row['Valor'])
-            channel = row['Canal de Venda']
-            date = datetime.strptime(row['Data'], "%Y-%m-%d %H:%M:%S")
-            client_type = row['Tipo de Cliente']
-            currency = row['Moeda']
-
-            commission = value * 0.10
-            if channel == 'Online':
-                commission *= 0.80
-
-            sales.append({
-                'seller_cpf': cpf,
-                'value': value,
-                'channel': channel,
-                'commission': commission,
-                'date': date,
-                'client_type': client_type,
-                'currency': currency
-            })
-
-            if cpf not in commissions:
-                commissions[cpf] = 0
-            commissions[cpf] += commission
-
-        for sale in sales:
-            self.sale_repository.save_sale(sale)
-
-        final_commissions = {}
-        for cpf, total_commission in commissions.items():
-            if total_commission >= 1000:
-                final_commission = total_commission * 0.90
-            else:
-                final_commission = total_commission
-            final_commissions[cpf] = final_commission
-
-        if errors:
-            return {'errors': errors, 'commissions': final_commissions}
-        return final_commissions
-
-    def get_sales_summary(self):
-        summary = self.sale_repository.get_sales_summary()
-
-        summary_by_channel = {}
-        summary_by_state = {}
-        summary_by_client_type = {}
-        summary_by_seller = {}
-
-        for sale in summary:
-            cpf, channel, value, commission, state, client_type = sale
-
-            if channel not in summary_by_channel:
-                summary_by_channel[channel] = {'total_value': 0, 'total_commission': 0, 'count': 0}
-            summary_by_channel[channel]['total_value'] += value
-            summary_by_channel[channel]['total_commission'] += commission
-            summary_by_channel[channel]['count'] += 1
-
-            if state not in summary_by_state:
-                summary_by_state[state] = {'total_value': 0, 'total_commission': 0, 'count': 0}
-            summary_by_state[state]['total_value'] += value
-            summary_by_state[state]['total_commission'] += commission
-            summary_by_state[state]['count'] += 1
-
-            if client_type not in summary_by_client_type:
-                summary_by_client_type[client_type] = {'total_value': 0, 'total_commission': 0, 'count': 0}
-            summary_by_client_type[client_type]['total_value'] += value
-            summary_by_client_type[client_type]['total_commission'] += commission
-            summary_by_client_type[client_type]['count'] += 1
-
-            if cpf not in summary_by_seller:
-                summary_by_seller[cpf] = {'total_value': 0, 'total_commission': 0, 'count': 0}
-            summary_by_seller[cpf]['total_value'] += value
-            summary_by_seller[cpf]['total_commission'] += commission
-            summary_by_seller[cpf]['count'] += 1
-
-        for channel in summary_by_channel:
-            summary_by_channel[channel]['average_value'] = round(summary_by_channel[channel]['total_value'] / summary_by_channel[channel]['count'], 2)
-            summary_by_channel[channel]['average_commission'] = round(summary_by_channel[channel]['total_commission'] / summary_by_channel[channel]['count'], 2)
-
-        for state in summary_by_state:
-            summary_by_state[state]['average_value'] = round(summary_by_state[state]['total_value'] / summary_by_state[state]['count'], 2)
-            summary_by_state[state]['average_commission'] = round(summary_by_state[state]['total_commission'] / summary_by_state[state]['count'], 2)
-
-        for client_type in summary_by_client_type:
-            summary_by_client_type[client_type]['average_value'] = round(summary_by_client_type[client_type]['total_value'] / summary_by_client_type[client_type]['count'], 2)
-            summary_by_client_type[client_type]['average_commission'] = round(summary_by_client_type[client_type]['total_commission'] / summary_by_client_type[client_type]['count'], 2)
-
-        for cpf in summary_by_seller:
-            summary_by_seller[cpf]['average_value'] = round(summary_by_seller[cpf]['total_value'] / summary_by_seller[cpf]['count'], 2)
-            summary_by_seller[cpf]['average_commission'] = round(summary_by_seller[cpf]['total_commission'] / summary_by_seller[cpf]['count'], 2)
+        if file_format == CSV:
+            chunks = pd.read_csv(sales_file, dtype={'CPF': str}, chunksize=chunksize)
+        else:
+            chunks = iter_columnar_frames(sales_file, file_format, SALES_UPLOAD_TYPES, chunksize, SALES_UPLOAD_ZERO_PAD)
+        for chunk in timed(chunks, 'parse'):
+            with phase('validate'):
+                self.read_seller_states(chunk['CPF'].unique(), seller_states, checked_cpfs)
+            with phase('compute'):
+                sales, rejected = split_known_sales(chunk, seller_states.keys())
+            yield sales, rejected
 
+    def read_seller_states(self, cpfs, seller_states: dict, checked_cpfs: set):
+        new_cpfs = [cpf for cpf in cpfs if cpf not in checked_cpfs]
+        if new_cpfs:
+            # Locked for the rest of the upload, so a seller's state can't
+            # change between counting its sales and committing them.
+            seller_states.update(self.seller_repository.get_states_by_cpf(new_cpfs, lock=True))
+            checked_cpfs.update(new_cpfs)
+
+    def get_sales_summary(self, filters: dict = None):
+        # The aggregate tables only hold all-time totals; filtered summaries
+        # are aggregated in SQL over the matching rows instead.
+        if filters:
+            return {
+                f'by_{dimension}': self.summarize_totals(self.sale_repository.get_sales_totals_by(dimension, filters))
+                for dimension in SUMMARY_DIMENSIONS
+            }
         return {
-            'by_channel': summary_by_channel,
-            'by_state': summary_by_state,
-            'by_client_type': summary_by_client_type,
-            'by_seller': summary_by_seller
+            f'by_{dimension}': self.summarize_totals(self.aggregate_repository.get_totals(dimension))
+            for dimension in SUMMARY_DIMENSIONS
         }
 
-    def get_sales_by_seller(self, seller_cpf):
+    def summarize_totals(self, totals):
+        summary = {}
+        for key, total_value, total_commission, count in totals:
+            summary[key] = {
+                'total_value': total_value,
+                'total_commission': total_commission,
+                'count': count,
+                'average_value': round(total_value / count, 2),
+                'average_commission': round(total_commission / count, 2)
+            }
+        return summary
+
+    def get_sales_by_seller(self, seller_cpf, filters: dict = None):
         seller = self.seller_repository.get_seller_by_cpf(seller_cpf)
         if not seller:
             return None
         
-        sales = self.sale_repository.get_sales_by_seller(seller_cpf)
+        sales = self.sale_repository.get_sales_by_seller(seller_cpf, filters)
         return [self.to_dict(sale) for sale in sales]
 
-    def get_summary_by_seller(self, seller_cpf):
+    def iter_sales_by_seller(self, seller_cpf, batch_size: int = STREAM_BATCH_SIZE):
         seller = self.seller_repository.get_seller_by_cpf(seller_cpf)
         if not seller:
             return None
-        
-        sales = self.get_sales_by_seller(seller_cpf)
-        total_value = sum(sale['value'] for sale in sales)
-        average_value = round(total_value / len(sales), 2) if sales else 0
-        total_commission = sum(sale['commission'] for sale in sales)
-        average_commission = round(total_commission / len(sales), 2) if sales else 0
+
+        sales = self.sale_repository.iter_sales_by_seller(seller_cpf, batch_size)
+        return (self.to_dict(sale) for sale in sales)
+
+    def get_sales_page_by_seller(self, seller_cpf, limit: int, after=None):
+        seller = self.seller_repository.get_seller_by_cpf(seller_cpf)
+        if not seller:
+            return None
+
+        if after:
+            after = cursor_values(after, datetime.fromisoformat, int)
+        sales = self.sale_repository.get_sales_page_by_seller(seller_cpf, limit + 1, after)
+        next_cursor = None
+        if len(sales) > limit:
+            last_sale = sales[limit - 1]
+            next_cursor = encode_cursor(last_sale.date.isoformat(), last_sale.id)
+        return {
+            'items': [self.to_dict(sale) for sale in sales[:limit]],
+            'next_cursor': next_cursor
+        }
+
+    def get_summary_by_seller(self, seller_cpf, filters: dict = None):
+        seller = self.seller_repository.get_seller_by_cpf(seller_cpf)
+        if not seller:
+            return None
+
+        sales = self.get_sales_by_seller(seller_cpf, filters)
+        if filters:
+            total_value, total_commission, count = self.sale_repository.get_seller_sales_totals(seller_cpf, filters)
+        else:
+            total_value, total_commission, count = self.aggregate_repository.get_seller_totals(seller_cpf) or (0, 0, 0)
+        average_value = round(total_value / count, 2) if count else 0
+        average_commission = round(total_commission / count, 2) if count else 0
         return {
             'seller_cpf': seller_cpf,
             'total_value': total_value,
@@ -147,6 +271,26 @@ class SaleService:
             'sales': sales
         }
 
+    def rebuild_sales_aggregates(self, repair: bool = True):
+        mismatches = []
+        for dimension in SUMMARY_DIMENSIONS:
+            expected_totals = self.sale_repository.get_sales_totals_by(dimension)
+            expected = {key: (total_value, total_commission, count) for key, total_value, total_commission, count in expected_totals}
+            stored = {key: (total_value, total_commission, count) for key, total_value, total_commission, count in self.aggregate_repository.get_totals(dimension)}
+            for key in expected.keys() | stored.keys():
+                if not totals_match(expected.get(key), stored.get(key)):
+                    mismatches.append({
+                        'dimension': dimension,
+                        'key': key,
+                        'expected': expected.get(key),
+                        'stored': stored.get(key)
+                    })
+            if repair:
+                self.aggregate_repository.replace_totals(dimension, expected_totals)
+        if repair:
+            self.sale_repository.commit()
+        return mismatches
+
     def to_dict(self, sale: Sale):
         return {
             'id': sale.id,
@@ -1,17 +1,33 @@
 import re
 from sqlalchemy.orm import Session
 from models.seller import Seller
+from repositories.sale_repository import SaleRepository
+from repositories.sales_aggregate_repository import SalesAggregateRepository
 from repositories.seller_repository import SellerRepository
-from utils.document_utils import is_valid_cpf
-from utils.email_utils import is_valid_email
+from utils.document_utils import are_valid_cpfs, is_valid_cpf
+from utils.email_utils import are_valid_emails, is_valid_email
+from utils.instrumentation import phase
+from utils.pagination import cursor_values, encode_cursor
+from utils.streaming import STREAM_BATCH_SIZE
+from utils.upload_formats import CSV, detect_format, read_columnar_frame
 from datetime import datetime
+import numpy as np
 import pandas as pd
 
+SELLER_UPLOAD_TYPES = {
+    'Nome': 'string',
+    'CPF': 'string',
+    'Data de Nascimento': 'timestamp[us]',
+    'Email': 'string',
+    'Estado': 'string'
+}
 VALID_STATES = {"AC", "AL", "AP", "AM", "BA", "CE", "DF", "ES", "GO", "MA", "MT", "MS", "MG", "PA", "PB", "PR", "PE", "PI", "RJ", "RN", "RS", "RO", "RR", "SC", "SP", "SE", "TO"}
 
 class SellerService:
     def __init__(self, db: Session):
         self.repository = SellerRepository(db)
+        self.aggregate_repository = SalesAggregateRepository(db)
+        self.sale_repository = SaleRepository(db)
 
     def get_seller(self, id: int):
         seller = self.repository.get_seller_by_id(id)
@@ -33,11 +49,12 @@ class SellerService:
             return {"error": "CPF already exists"}
         birth_date = datetime.strptime(birth_date, "%d/%m/%Y").date()
         seller = Seller(name=name, cpf=cpf, birth_date=birth_date, email=email, state=state)
+        self.aggregate_repository.add_seller(cpf, state)
         created_seller = self.repository.create_seller(seller)
         return self.to_dict(created_seller)
 
     def update_seller(self, id: int, data: dict):
-        seller = self.repository.get_seller_by_id(id)
+        seller = self.repository.get_seller_for_update(id)
         if not seller:
             return None
 
@@ -45,7 +62,7 @@ class SellerService:
             data['cpf'] = ''.join(filter(str.isdigit, str(data['cpf']))).zfill(11)
             if not is_valid_cpf(data['cpf']):
                 return {"error": "Invalid CPF"}
-            if data['cpf'] != seller.cpf and self.repository.get_seller_by_cpf(data['cpf']):
+            if data['cpf'] != seller.cpf and self.repository.get_existing_cpfs([data['cpf']]):
                 return {"error": "CPF already exists"}
         
         if 'email' in data and not is_valid_email(data['email']):
@@ -54,59 +71,102 @@ class SellerService:
         if 'state' in data and data['state'] not in VALID_STATES:
             return {"error": "Invalid state abbreviation"}
 
+        old_cpf, old_state = seller.cpf, seller.state
+        if data.get('cpf', old_cpf) != old_cpf:
+            # Counted before the change: the cascading foreign key moves the
+            # sales to the new CPF as soon as the seller is flushed.
+            self.aggregate_repository.remove_seller(old_cpf, old_state)
         for key, value in data.items():
             if key == 'birth_date':
                 value = datetime.strptime(value, "%d/%m/%Y").date()
             setattr(seller, key, value)
+        if seller.cpf != old_cpf:
+            self.repository.move_sales(old_cpf, seller.cpf)
+            self.aggregate_repository.add_seller(seller.cpf, seller.state)
+        elif seller.state != old_state:
+            self.aggregate_repository.move_seller_state(seller.cpf, old_state, seller.state)
         updated_seller = self.repository.update_seller(seller)
         return self.to_dict(updated_seller)
 
     def delete_seller(self, id: int):
-        seller = self.repository.get_seller_by_id(id)
+        seller = self.repository.get_seller_for_update(id)
         if not seller:
             return False
-        self.repository.delete_seller(seller)
+        # Sales are records of commissions already paid, so they are never
+        # deleted with their seller, and a seller with sales stays.
+        if not self.repository.delete_seller(seller):
+            return {"error": "Seller has sales and cannot be deleted"}
         return True
 
     def get_all_sellers(self):
         sellers = self.repository.get_all_sellers()
         return [self.to_dict(seller) for seller in sellers]
 
-    def load_sellers_from_csv(self, file_path: str):
-        df = pd.read_csv(file_path)
-        errors = []
-
-        for _, row in df.iterrows():
-            seller_data = {
-                'name': row['Nome'],
-                'cpf': ''.join(filter(str.isdigit, str(row['CPF']))).zfill(11),
-                'birth_date': row['Data de Nascimento'],
-                'email': row['Email'],
-                'state': row['Estado']
-            }
-
-            if not is_valid_cpf(seller_data['cpf']):
-                errors.append(f"Invalid CPF: {seller_data['cpf']}")
-                continue
-
-            if not is_valid_email(seller_data['email']):
-                errors.append(f"Invalid email: {seller_data['email']}")
-                continue
-
-            if seller_data['state'] not in VALID_STATES:
-                errors.append(f"Invalid state abbreviation: {seller_data['state']}")
-                continue
-
-            existing_seller = self.repository.get_seller_by_cpf(seller_data['cpf'])
-            if existing_seller:
-                self.update_seller(existing_seller.id, seller_data)
+    def iter_all_sellers(self, batch_size: int = STREAM_BATCH_SIZE):
+        return (self.to_dict(seller) for seller in self.repository.iter_all_sellers(batch_size))
+
+    def get_sellers_page(self, limit: int, after=None):
+        after_id = cursor_values(after, int)[0] if after else None
+        sellers = self.repository.get_sellers_page(limit + 1, after_id)
+        next_cursor = encode_cursor(sellers[limit - 1].id) if len(sellers) > limit else None
+        return {
+            'items': [self.to_dict(seller) for seller in sellers[:limit]],
+            'next_cursor': next_cursor
+        }
+
+    def load_sellers_from_csv(self, sellers_file, stats: dict = None, content_type: str = None):
+        with phase('parse'):
+            file_format = detect_format(sellers_file, content_type)
+            if file_format == CSV:
+                df = pd.read_csv(sellers_file, dtype={'CPF': str})
             else:
-                self.create_seller(**seller_data)
+                df = read_columnar_frame(sellers_file, file_format, SELLER_UPLOAD_TYPES)
+
+        with phase('validate'):
+            errors, sellers = self.validate_sellers(df)
+        if stats is not None:
+            stats.update(rows_read=len(df), rows_saved=len(sellers), rows_rejected=len(errors))
+
+        with phase('persist'):
+            existing_states = self.repository.get_states_by_cpf(sellers['cpf'])
+            new_cpfs = [cpf for cpf in sellers['cpf'] if cpf not in existing_states]
+            cpfs_with_sales = self.sale_repository.get_cpfs_with_sales(new_cpfs) if new_cpfs else set()
+            for cpf, state in zip(sellers['cpf'], sellers['state']):
+                if cpf in existing_states and existing_states[cpf] != state:
+                    self.aggregate_repository.move_seller_state(cpf, existing_states[cpf], state)
+                elif cpf in cpfs_with_sales:
+                    self.aggregate_repository.add_seller(cpf, state)
+            self.repository.upsert_sellers_bulk(sellers.to_dict('records'))
 
         if errors:
             return {"errors": errors}
         return {"message": "Sellers loaded successfully"}
 
+    def validate_sellers(self, df: pd.DataFrame):
+        cpfs = df['CPF'].astype(str).str.replace(r'\D', '', regex=True).str.zfill(11)
+        emails = df['Email'].astype(str)
+        states = df['Estado'].astype(str)
+        invalid_cpf = ~are_valid_cpfs(cpfs)
+        invalid_email = ~are_valid_emails(emails)
+        invalid_state = ~states.isin(VALID_STATES).to_numpy()
+
+        row_errors = np.select(
+            [invalid_cpf, invalid_email, invalid_state],
+            ["Invalid CPF: " + cpfs, "Invalid email: " + emails, "Invalid state abbreviation: " + states],
+            default=None
+        )
+        errors = [error for error in row_errors if error is not None]
+
+        valid = ~(invalid_cpf | invalid_email | invalid_state)
+        sellers = pd.DataFrame({
+            'cpf': cpfs[valid],
+            'name': df['Nome'][valid],
+            'birth_date': pd.to_datetime(df['Data de Nascimento'][valid], format="%d/%m/%Y").dt.date,
+            'email': emails[valid],
+            'state': states[valid]
+        }).drop_duplicates('cpf', keep='last')
+        return errors, sellers
+
     def to_dict(self, seller: Seller):
         if not seller:
             return None
@@ -0,0 +1,13 @@
+import os
+import shutil
+import tempfile
+
+# The app's engine is built from DATABASE_URL when database.database is first
+# imported, so it has to point away from the committed sellers.db before any
+# test module is collected.
+TEST_DATABASE_DIR = tempfile.mkdtemp(prefix='sales-tests-')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DATABASE_DIR, 'sellers.db')}"
+
+
+def pytest_unconfigure(config):
+    shutil.rmtree(TEST_DATABASE_DIR, ignore_errors=True)
@@ -0,0 +1,37 @@
+import numpy as np
+import pandas as pd
+from benchmarks.datagen import UNKNOWN_CPF, generate_cpfs, generate_dataset
+from benchmarks.suite import compare_reports
+from utils.document_utils import are_valid_cpfs
+
+
+def test_generated_cpfs_are_valid_unique_and_seeded():
+    cpfs = generate_cpfs(500, np.random.default_rng(7))
+
+    assert are_valid_cpfs(cpfs).all()
+    assert len(set(cpfs)) == 500
+    assert UNKNOWN_CPF not in cpfs
+    assert generate_cpfs(500, np.random.default_rng(7)) == cpfs
+
+
+def test_generated_files_match_upload_formats(tmp_path):
+    dataset = generate_dataset(str(tmp_path), sellers=50, sales=1000, seed=3, unknown_fraction=0.1)
+
+    sellers = pd.read_csv(dataset['sellers_path'], dtype={'CPF': str})
+    sales = pd.read_csv(dataset['sales_path'], dtype={'CPF': str})
+    assert list(sellers.columns) == ['Nome', 'CPF', 'Data de Nascimento', 'Email', 'Estado']
+    assert list(sales.columns) == ['CPF', 'Valor', 'Canal de Venda', 'Data', 'Tipo de Cliente', 'Moeda']
+    assert len(sales) == 1000
+    assert set(sales['CPF']) <= set(sellers['CPF']) | {UNKNOWN_CPF}
+    assert 0 < (sales['CPF'] == UNKNOWN_CPF).sum() < 200
+    pd.to_datetime(sales['Data'], format="%Y-%m-%d %H:%M:%S")
+
+
+def test_compare_reports_flags_slower_medians():
+    def report(median):
+        return {'scales': [{'sales_rows': 1000, 'measurements': {'GET /sales/summary': {'median_s': median}}}]}
+
+    assert compare_reports(report(0.12), report(0.10), tolerance=0.5) == []
+    assert compare_reports(report(0.002), report(0.001), tolerance=0.2) == []
+    regressions = compare_reports(report(0.30), report(0.10), tolerance=0.5)
+    assert [(regression['measurement'], regression['ratio']) for regression in regressions] == [('GET /sales/summary', 3.0)]
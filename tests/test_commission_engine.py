@@ -0,0 +1,78 @@
+import random
+from datetime import datetime, timedelta
+import pandas as pd
+from services.commission_engine import CommissionAccumulator, build_sales_frame
+
+
+def reference_commissions(df):
+    commissions = {}
+    for _, row in df.iterrows():
+        cpf = row['CPF']
+        value = float(row['Valor'])
+        channel = row['Canal de Venda']
+        datetime.strptime(row['Data'], "%Y-%m-%d %H:%M:%S")
+
+        commission = value * 0.10
+        if channel == 'Online':
+            commission *= 0.80
+
+        if cpf not in commissions:
+            commissions[cpf] = 0
+        commissions[cpf] += commission
+
+    final_commissions = {}
+    for cpf, total_commission in commissions.items():
+        if total_commission >= 1000:
+            final_commissions[cpf] = total_commission * 0.90
+        else:
+            final_commissions[cpf] = total_commission
+    return final_commissions
+
+
+def calculate_final_commissions(cpfs, commissions):
+    accumulator = CommissionAccumulator()
+    accumulator.add(cpfs, commissions)
+    return accumulator.final_commissions()
+
+
+def random_sales(rows, seed=42):
+    rng = random.Random(seed)
+    cpfs = [str(rng.randrange(10**10, 10**11)).zfill(11) for _ in range(25)]
+    start = datetime(2023, 1, 1)
+    return pd.DataFrame({
+        'CPF': [rng.choice(cpfs) for _ in range(rows)],
+        'Valor': [round(rng.uniform(1, 5000), 2) for _ in range(rows)],
+        'Canal de Venda': [rng.choice(['Online', 'Telefone', 'Loja física']) for _ in range(rows)],
+        'Data': [(start + timedelta(seconds=rng.randrange(10**7))).strftime("%Y-%m-%d %H:%M:%S") for _ in range(rows)],
+        'Tipo de Cliente': [rng.choice(['Novo', 'Fidelizado']) for _ in range(rows)],
+        'Moeda': ['BRL'] * rows
+    })
+
+
+def test_commission_engine_matches_row_by_row_rules():
+    df = random_sales(2000)
+
+    sales = build_sales_frame(df)
+    commissions = calculate_final_commissions(sales['seller_cpf'], sales['commission'].to_numpy())
+
+    expected = reference_commissions(df)
+    assert list(commissions) == list(expected)
+    assert commissions == expected
+
+
+def test_commission_engine_tier_threshold():
+    df = pd.DataFrame({
+        'CPF': ['04097026097', '04097026097', '04097026098'],
+        'Valor': [5000, 5000, 9999],
+        'Canal de Venda': ['Loja física', 'Loja física', 'Online'],
+        'Data': ['2023-07-01 14:30:00', '2023-07-02 14:30:00', '2023-07-03 14:30:00'],
+        'Tipo de Cliente': ['Novo', 'Novo', 'Fidelizado'],
+        'Moeda': ['BRL', 'BRL', 'BRL']
+    })
+
+    sales = build_sales_frame(df)
+    commissions = calculate_final_commissions(sales['seller_cpf'], sales['commission'].to_numpy())
+
+    assert commissions == reference_commissions(df)
+    assert commissions['04097026097'] == 900.0
+    assert sales['date'].iloc[0] == datetime(2023, 7, 1, 14, 30)
@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from models.seller import Seller, Base
+from services.commission_jobs import CommissionJobRunner
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with Session() as db:
+        db.add(Seller(name="Seller", cpf="04097026097", birth_date=datetime(2000, 1, 1).date(), email="a@a.com", state="SP"))
+        db.commit()
+    yield Session
+    engine.dispose()
+
+def write_sales_file(path, rows, day=1):
+    with open(path, "w") as f:
+        f.write("CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n")
+        for minute in range(rows):
+            f.write(f"04097026097,1000,Online,2023-07-{day:02d} 14:{minute:02d}:00,Novo,BRL\n")
+        f.write("04097026000,1000,Online,2023-07-01 14:30:00,Novo,BRL\n")
+
+def wait_for(runner, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = runner.get(job_id)
+        if job['status'] in ('succeeded', 'failed'):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+def test_jobs_run_in_background_and_report_results(session_factory, tmp_path):
+    runner = CommissionJobRunner(session_factory, max_workers=2, serialize_writes=True)
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"sales-{index}.csv"
+        write_sales_file(path, rows=5, day=index + 1)
+        paths.append(path)
+
+    jobs = [runner.submit(str(path)) for path in paths]
+    assert all(job['status'] in ('queued', 'running', 'succeeded') for job in jobs)
+
+    for job in jobs:
+        finished = wait_for(runner, job['id'])
+        assert finished['status'] == 'succeeded'
+        assert finished['progress'] == {'rows_read': 6, 'rows_saved': 5, 'rows_skipped': 0, 'rows_rejected': 1}
+        assert finished['result']['commissions'] == {"04097026097": pytest.approx(400.0)}
+        assert len(finished['result']['errors']) == 1
+    assert not any(path.exists() for path in paths)
+    runner.shutdown()
+
+def test_job_concurrency_is_bounded(session_factory, tmp_path):
+    runner = CommissionJobRunner(session_factory, max_workers=2)
+    running = []
+    peak = []
+    release = threading.Event()
+
+    def blocking_run(job, file_path, cleanup, idempotency_key=None, content_type=None):
+        running.append(job['id'])
+        peak.append(len(running))
+        release.wait(5)
+        running.remove(job['id'])
+        job['status'] = 'succeeded'
+
+    runner.run = blocking_run
+    jobs = [runner.submit("unused.csv") for _ in range(5)]
+    time.sleep(0.2)
+    assert max(peak) == 2
+    release.set()
+    runner.shutdown()
+    assert all(runner.get(job['id'])['status'] == 'succeeded' for job in jobs)
+
+def test_replayed_job_skips_stored_sales(session_factory, tmp_path):
+    runner = CommissionJobRunner(session_factory, max_workers=1)
+    path = tmp_path / "sales.csv"
+    write_sales_file(path, rows=3)
+
+    first = wait_for(runner, runner.submit(str(path), cleanup=False)['id'])
+    replay = wait_for(runner, runner.submit(str(path), cleanup=False)['id'])
+
+    assert first['progress']['rows_saved'] == 3
+    assert replay['progress']['rows_saved'] == 0
+    assert replay['progress']['rows_skipped'] == 3
+    assert replay['result'] == dict(first['result'], commissions={})
+    runner.shutdown()
+
+def test_failed_job_reports_error(session_factory, tmp_path):
+    runner = CommissionJobRunner(session_factory, max_workers=1)
+    path = tmp_path / "broken.csv"
+    path.write_text("CPF,Valor\n04097026097,1000\n")
+
+    job = wait_for(runner, runner.submit(str(path))['id'])
+
+    assert job['status'] == 'failed'
+    assert job['error']
+    assert job['finished_at']
+    runner.shutdown()
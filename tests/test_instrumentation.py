@@ -0,0 +1,31 @@
+import time
+from sqlalchemy import create_engine, text
+from utils.instrumentation import instrument_engine, phase, registry, timed, track
+
+
+def test_track_counts_queries_and_phases():
+    engine = create_engine("sqlite:///:memory:")
+    instrument_engine(engine)
+
+    with track('test:queries') as metrics:
+        with engine.connect() as connection:
+            for _ in range(3):
+                connection.execute(text("SELECT 1"))
+        for _ in timed(iter([1, 2]), 'parse'):
+            with phase('compute'):
+                time.sleep(0.01)
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+    assert metrics.queries == 3
+    assert metrics.query_seconds > 0
+    assert set(metrics.phases) == {'parse', 'compute'}
+    assert metrics.phases['compute'] >= 0.02
+    assert registry.queries['test:queries'] == 3
+    assert 'request_phase_seconds_count{endpoint="test:queries",phase="compute"} 1' in registry.render()
+
+
+def test_phases_outside_a_request_are_ignored():
+    with phase('parse'):
+        pass
+    assert list(timed([1, 2], 'parse')) == [1, 2]
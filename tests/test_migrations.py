@@ -0,0 +1,59 @@
+from datetime import datetime
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+from database.database import Base
+from database.migrations import MIGRATIONS, run_migrations
+from models.sale import Sale
+from models.sales_aggregate import SalesAggregate
+from models.seller import Seller
+from utils.row_hash import SaleRowHasher
+import pandas as pd
+
+OLD_SALES_TABLE = """
+CREATE TABLE sales (
+    id INTEGER NOT NULL PRIMARY KEY,
+    seller_cpf VARCHAR NOT NULL REFERENCES sellers (cpf),
+    value FLOAT NOT NULL,
+    channel VARCHAR NOT NULL,
+    commission FLOAT NOT NULL,
+    date DATETIME NOT NULL,
+    client_type VARCHAR NOT NULL,
+    currency VARCHAR NOT NULL
+)
+"""
+
+def test_run_migrations_upgrades_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sellers.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(OLD_SALES_TABLE)
+    Base.metadata.create_all(engine)
+
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    db.add(Seller(name="Seller", cpf="04097026097", birth_date=datetime(2000, 1, 1).date(), email="a@a.com", state="SP"))
+    db.commit()
+    with engine.begin() as connection:
+        # The same sale stored twice by a retried upload.
+        for _ in range(2):
+            connection.exec_driver_sql(
+                "INSERT INTO sales (seller_cpf, value, channel, commission, date, client_type, currency) "
+                "VALUES ('04097026097', 1000.0, 'Online', 80.0, '2023-07-01 14:30:00.000000', 'Novo', 'BRL')"
+            )
+
+    assert inspect(engine).get_indexes('sales') == []
+
+    assert run_migrations(engine) == [version for version, _, _ in MIGRATIONS]
+    assert run_migrations(engine) == []
+
+    index_names = {index['name'] for index in inspect(engine).get_indexes('sales')}
+    assert {index.name for index in Sale.__table__.indexes} <= index_names
+    aggregate = db.query(SalesAggregate).filter(SalesAggregate.dimension == 'channel', SalesAggregate.key == "Online").one()
+    assert (aggregate.total_value, aggregate.count) == (2000.0, 2)
+    row_hashes = [sale.row_hash for sale in db.query(Sale).order_by(Sale.id)]
+    stored_twice = pd.DataFrame([{
+        'seller_cpf': "04097026097", 'value': 1000.0, 'channel': "Online",
+        'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"
+    }] * 2)
+    assert row_hashes == SaleRowHasher().hash(stored_twice)
+    assert row_hashes[0] != row_hashes[1]
+    db.close()
@@ -0,0 +1,108 @@
+from functools import partial
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+from services.commission_engine import split_known_sales
+from services.parallel_commissions import can_shard, iter_sales_shards, shard_ranges, should_shard
+from services.sale_service import SaleService
+from tests.test_commission_engine import calculate_final_commissions, random_sales
+
+
+@pytest.fixture
+def sales_path(tmp_path):
+    df = random_sales(3000)
+    df.loc[::7, 'CPF'] = '00000000000'
+    path = tmp_path / 'sales.csv'
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def test_shard_ranges_cover_whole_lines(sales_path):
+    header, ranges = shard_ranges(sales_path, shard_bytes=1000)
+
+    with open(sales_path, 'rb') as file:
+        content = file.read()
+    assert len(ranges) > 1
+    assert content.startswith(header)
+    assert ranges[0][0] == len(header)
+    assert ranges[-1][1] == len(content)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start
+        assert content[end - 1:end] == b'\n'
+
+
+def test_sales_shards_match_serial_validation(sales_path):
+    df = pd.read_csv(sales_path, dtype={'CPF': str})
+    known_cpfs = set(df['CPF']) - {'00000000000'}
+    expected_sales, expected_unknown = split_known_sales(df, known_cpfs)
+
+    shards = list(iter_sales_shards(sales_path, known_cpfs, workers=2, shard_bytes=16 * 1024))
+
+    assert len(shards) > 2
+    sales = pd.concat([sales for sales, _ in shards], ignore_index=True)
+    unknown = pd.concat([unknown for _, unknown in shards], ignore_index=True)
+    pd.testing.assert_frame_equal(sales, expected_sales.reset_index(drop=True))
+    pd.testing.assert_frame_equal(unknown, expected_unknown.reset_index(drop=True))
+
+
+def test_parallel_commissions_match_serial_path(sales_path, monkeypatch):
+    df = pd.read_csv(sales_path, dtype={'CPF': str})
+    known_cpfs = set(df['CPF']) - {'00000000000'}
+
+    def run(workers):
+        service = SaleService(MagicMock())
+        service.seller_repository.get_states_by_cpf = MagicMock(side_effect=lambda cpfs, **options: dict.fromkeys(known_cpfs & set(cpfs), "SP"))
+        service.seller_repository.get_all_cpfs = MagicMock(return_value=known_cpfs)
+        service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: set(sales['row_hash']))
+        stats = {}
+        return service.calculate_commissions(sales_path, chunksize=500, stats=stats, workers=workers), stats
+
+    monkeypatch.setattr('services.sale_service.iter_sales_shards', partial(iter_sales_shards, shard_bytes=8 * 1024))
+    monkeypatch.setattr('services.parallel_commissions.COMMISSION_PARALLEL_MIN_BYTES', 0)
+    serial, serial_stats = run(workers=1)
+    parallel, parallel_stats = run(workers=3)
+
+    assert list(parallel['commissions']) == list(serial['commissions'])
+    assert parallel == serial
+    assert parallel_stats == serial_stats
+    sales = split_known_sales(df, known_cpfs)[0]
+    assert serial['commissions'] == calculate_final_commissions(sales['seller_cpf'], sales['commission'].to_numpy())
+
+
+def test_sales_shards_from_a_stream_match_the_path(sales_path):
+    df = pd.read_csv(sales_path, dtype={'CPF': str})
+    known_cpfs = set(df['CPF']) - {'00000000000'}
+
+    from_path = list(iter_sales_shards(sales_path, known_cpfs, workers=2, shard_bytes=16 * 1024))
+    with open(sales_path, 'rb') as file:
+        assert can_shard(file)
+        from_stream = list(iter_sales_shards(file, known_cpfs, workers=2, shard_bytes=16 * 1024))
+
+    assert len(from_stream) == len(from_path)
+    for (sales, unknown), (expected_sales, expected_unknown) in zip(from_stream, from_path):
+        pd.testing.assert_frame_equal(sales, expected_sales)
+        pd.testing.assert_frame_equal(unknown, expected_unknown)
+    with open(sales_path) as file:
+        assert not can_shard(file)
+
+
+def test_shards_never_cut_inside_quoted_newlines(tmp_path):
+    df = random_sales(400)
+    df.loc[::3, 'Canal de Venda'] = 'Loja física\n"centro", térreo'
+    path = tmp_path / 'quoted.csv'
+    df.to_csv(path, index=False)
+    known_cpfs = set(df['CPF'])
+
+    shards = list(iter_sales_shards(str(path), known_cpfs, workers=2, shard_bytes=1024))
+
+    assert len(shards) > 2
+    sales = pd.concat([sales for sales, _ in shards], ignore_index=True)
+    expected = split_known_sales(pd.read_csv(path, dtype={'CPF': str}), known_cpfs)[0]
+    pd.testing.assert_frame_equal(sales, expected.reset_index(drop=True))
+
+
+def test_small_uploads_are_not_sharded(sales_path, monkeypatch):
+    assert not should_shard(sales_path, workers=4)
+    monkeypatch.setattr('services.parallel_commissions.COMMISSION_PARALLEL_MIN_BYTES', 1024)
+    assert should_shard(sales_path, workers=4)
+    assert not should_shard(sales_path, workers=1)
@@ -0,0 +1,75 @@
+import os
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.bulk import supports_copy
+from models.seller import Seller, Base
+from models.sale import Sale
+from repositories.sale_repository import SaleRepository
+from repositories.seller_repository import SellerRepository
+
+# Point this at a disposable local PostgreSQL (or compatible stand-in) to run
+# the COPY fast lane, e.g. postgresql+psycopg2://postgres@localhost/sales_test
+POSTGRES_URL = os.environ.get("TEST_POSTGRES_URL")
+
+pytestmark = pytest.mark.skipif(not POSTGRES_URL, reason="TEST_POSTGRES_URL is not set")
+
+@pytest.fixture
+def db():
+    engine = create_engine(POSTGRES_URL)
+    Session = sessionmaker(bind=engine, autoflush=False)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    session = Session()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+    engine.dispose()
+
+def test_bulk_loads_use_copy(db):
+    assert supports_copy(db)
+    seller_repository = SellerRepository(db)
+    sellers = [
+        {'cpf': "25653370002", 'name': "Alice Silva", 'birth_date': datetime(1980, 1, 1).date(),
+         'email': "alice.silva@example.com", 'state': "SP"},
+        {'cpf': "83177313083", 'name': "Bruno Costa", 'birth_date': datetime(1985, 5, 15).date(),
+         'email': "bruno.costa@example.com", 'state': "RJ"}
+    ]
+    seller_repository.upsert_sellers_bulk(sellers, batch_size=1)
+    seller_repository.upsert_sellers_bulk([dict(sellers[0], state="MG")])
+
+    assert db.query(Seller).count() == 2
+    assert seller_repository.get_seller_by_cpf("25653370002").state == "MG"
+
+    sale_repository = SaleRepository(db)
+    new_sales = [
+        {'seller_cpf': "25653370002", 'value': 1000.0, 'channel': "Loja física, centro", 'commission': 100.0,
+         'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "83177313083", 'value': 500.0, 'channel': "Online", 'commission': 40.0,
+         'date': datetime(2023, 7, 2, 9, 0), 'client_type': "Fidelizado", 'currency': "BRL"}
+    ]
+    assert sale_repository.save_sales_bulk(new_sales, batch_size=1) == 2
+    assert sale_repository.save_sales_bulk(new_sales) == 0
+
+    sales = db.query(Sale).order_by(Sale.date).all()
+    assert [sale.channel for sale in sales] == ["Loja física, centro", "Online"]
+    assert sales[0].date == datetime(2023, 7, 1, 14, 30)
+
+def test_seller_cpf_change_cascades_and_delete_keeps_sales(db):
+    from services.seller_service import SellerService
+
+    seller = Seller(name="Alice Silva", cpf="25653370002", birth_date=datetime(1980, 1, 1).date(),
+                    email="alice.silva@example.com", state="SP")
+    db.add(seller)
+    db.commit()
+    SaleRepository(db).save_sales_bulk([
+        {'seller_cpf': "25653370002", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+         'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"}
+    ])
+
+    SellerService(db).update_seller(seller.id, {'cpf': "52998224725"})
+    assert [sale.seller_cpf for sale in db.query(Sale)] == ["52998224725"]
+
+    assert SellerService(db).delete_seller(seller.id) == {"error": "Seller has sales and cannot be deleted"}
+    assert db.query(Sale).count() == 1
@@ -0,0 +1,80 @@
+import os
+import pstats
+import time
+from flask import Flask
+from utils.profiling import RequestProfiler, install_profiler
+
+
+def create_app(profiler):
+    app = Flask(__name__)
+    install_profiler(app, profiler)
+
+    @app.route('/work')
+    def work():
+        time.sleep(0.05)
+        return 'done'
+
+    @app.route('/fast')
+    def fast():
+        return 'done'
+
+    return app
+
+
+def test_profile_requested_with_token(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), token='secret')
+    client = create_app(profiler).test_client()
+
+    assert 'X-Profile-Id' not in client.get('/work').headers
+    assert 'X-Profile-Id' not in client.get('/work', headers={'X-Profile': 'wrong'}).headers
+    assert os.listdir(tmp_path) == []
+
+    name = client.get('/work', headers={'X-Profile': 'secret'}).headers['X-Profile-Id']
+    assert pstats.Stats(str(tmp_path / f'{name}.pstats')).total_calls > 0
+    stacks = (tmp_path / f'{name}.collapsed').read_text().splitlines()
+    assert any('work (test_profiling.py' in line.rsplit(' ', 1)[0] for line in stacks)
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in stacks)
+
+    assert 'X-Profile-Id' in client.get('/fast?profile=secret').headers
+
+
+def test_slow_requests_are_kept_and_retention_is_bounded(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), threshold_ms=20, max_files=2)
+    client = create_app(profiler).test_client()
+
+    assert 'X-Profile-Id' not in client.get('/fast').headers
+    names = [client.get('/work').headers['X-Profile-Id'] for _ in range(3)]
+
+    assert sorted(os.listdir(tmp_path)) == sorted(f'{name}.collapsed' for name in names[1:])
+    assert profiler.sampler.samples == {}
+
+
+def test_overlapping_profiled_requests_fall_back_to_sampling(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), token='secret')
+    app = create_app(profiler)
+    first = profiler.start(app.test_request_context(headers={'X-Profile': 'secret'}).request)
+    second = profiler.start(app.test_request_context(headers={'X-Profile': 'secret'}).request)
+
+    assert first['cprofile'] is not None
+    assert second['cprofile'] is None
+    second_name = profiler.finish(second, 'GET', '/work')
+    first_name = profiler.finish(first, 'GET', '/work')
+
+    assert sorted(os.listdir(tmp_path)) == sorted([
+        f'{first_name}.pstats', f'{first_name}.collapsed', f'{second_name}.collapsed'
+    ])
+    third = profiler.start(app.test_request_context(headers={'X-Profile': 'secret'}).request)
+    assert third['cprofile'] is not None
+    profiler.stop(third)
+
+
+def test_retention_keeps_or_removes_whole_profiles(tmp_path):
+    profiler = RequestProfiler(str(tmp_path), max_files=2)
+    mtimes = {'a.pstats': 100, 'a.collapsed': 400, 'b.pstats': 200, 'b.collapsed': 200, 'c.collapsed': 300}
+    for file_name, mtime in mtimes.items():
+        (tmp_path / file_name).write_text('')
+        os.utime(tmp_path / file_name, (mtime, mtime))
+
+    profiler.enforce_retention()
+
+    assert sorted(os.listdir(tmp_path)) == ['a.collapsed', 'a.pstats', 'c.collapsed']
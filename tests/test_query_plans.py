@@ -0,0 +1,85 @@
+from contextlib import contextmanager
+from datetime import datetime
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from models.seller import Base
+from repositories.sale_repository import SaleRepository
+from repositories.sales_aggregate_repository import SalesAggregateRepository
+from repositories.seller_repository import SellerRepository
+
+DATABASE_URL = "sqlite:///:memory:"
+
+@pytest.fixture
+def db():
+    engine = create_engine(DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    session = Session()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+@contextmanager
+def captured_selects(db):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            statements.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', capture)
+
+def query_plans(db, statements):
+    connection = db.connection()
+    return [
+        [row[3] for row in connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters)]
+        for statement, parameters in statements
+    ]
+
+def assert_uses_index(plan, index_name):
+    assert not any(step.startswith('SCAN sales') for step in plan), plan
+    assert not any('TEMP B-TREE' in step for step in plan), plan
+    assert any(index_name in step for step in plan), plan
+
+def test_sales_by_seller_queries_use_seller_date_index(db):
+    repository = SaleRepository(db)
+    with captured_selects(db) as statements:
+        repository.get_sales_by_seller("04097026097")
+        repository.get_sales_page_by_seller("04097026097", 100, after=(datetime(2023, 7, 1), 10))
+        list(repository.iter_sales_by_seller("04097026097", 100))
+        SalesAggregateRepository(db).seller_contributions("04097026097", "SP")
+
+    plans = query_plans(db, statements)
+    assert len(plans) == 5
+    for plan in plans[:3]:
+        assert_uses_index(plan, 'ix_sales_seller_cpf_date')
+    for plan in plans[3:]:
+        assert not any(step.startswith('SCAN sales') for step in plan), plan
+        assert any('ix_sales_seller_cpf_date' in step for step in plan), plan
+
+def test_seller_lookups_use_cpf_index(db):
+    repository = SellerRepository(db)
+    with captured_selects(db) as statements:
+        repository.get_seller_by_cpf("04097026097")
+        repository.get_existing_cpfs(["04097026097", "04097026098"])
+
+    for plan in query_plans(db, statements):
+        assert not any(step.startswith('SCAN sellers') for step in plan), plan
+
+def test_date_filtered_summaries_use_date_indexes(db):
+    repository = SaleRepository(db)
+    filters = {'date_from': datetime(2023, 7, 1), 'date_before': datetime(2023, 8, 1)}
+    with captured_selects(db) as statements:
+        repository.get_sales_totals_by('channel', filters)
+        repository.get_seller_sales_totals("04097026097", filters)
+
+    summary_plan, seller_plan = query_plans(db, statements)
+    assert any('ix_sales_date' in step for step in summary_plan), summary_plan
+    assert not any(step.startswith('SCAN sales') for step in summary_plan), summary_plan
+    assert_uses_index(seller_plan, 'ix_sales_seller_cpf_date')
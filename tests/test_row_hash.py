@@ -0,0 +1,52 @@
+import math
+from collections import Counter
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from utils.row_hash import OccurrenceCounter, SaleRowHasher, canonical_rows
+
+
+def sales_frame(rows):
+    return pd.DataFrame(rows, columns=['seller_cpf', 'value', 'channel', 'date', 'client_type', 'currency'])
+
+
+def test_row_hashes_are_pinned_to_the_canonical_encoding():
+    # Stored hashes must not change between releases, or retried uploads stop
+    # deduplicating; a change here needs a migration that rehashes the table.
+    sale = ("04097026097", 1000, "Online", datetime(2023, 7, 1, 14, 30), "Novo", "BRL")
+    same_sale = ("04097026097", 1000.0, "Online", pd.Timestamp("2023-07-01 14:30:00").as_unit('s'), "Novo", "BRL")
+
+    assert canonical_rows(sales_frame([sale])) == ["04097026097\x1f1000.0\x1fOnline\x1f1688221800000000\x1fNovo\x1fBRL"]
+    assert SaleRowHasher().hash(sales_frame([sale, same_sale])) == [
+        "6ad98cf844cc326bd79082c9d1803784",
+        "1d03ceb5dbdf5560e6d96856b072c77e"
+    ]
+
+
+def test_identical_sales_are_numbered_across_chunks():
+    sales = sales_frame([
+        ("04097026097", value, "Online", datetime(2023, 7, 1, 14, 30), "Novo", "BRL")
+        for value in [10.0, 20.0, 10.0, 10.0, 20.0, 30.0]
+    ])
+    whole = SaleRowHasher().hash(sales)
+
+    hasher = SaleRowHasher()
+    chunked = hasher.hash(sales.iloc[:1]) + hasher.hash(sales.iloc[1:4]) + hasher.hash(sales.iloc[4:])
+
+    assert chunked == whole
+    assert len(set(whole)) == 6
+
+
+def test_occurrence_counter_matches_a_plain_count_with_few_runs():
+    keys = np.random.default_rng(5).integers(0, 3000, 50_000).astype(np.uint64)
+    counter = OccurrenceCounter()
+
+    numbered = np.concatenate([counter.number(keys[start:start + 700]) for start in range(0, len(keys), 700)])
+
+    seen = Counter()
+    expected = []
+    for key in keys.tolist():
+        expected.append(seen[key])
+        seen[key] += 1
+    assert numbered.tolist() == expected
+    assert len(counter.runs) <= math.log2(len(keys)) + 1
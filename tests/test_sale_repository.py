@@ -5,6 +5,7 @@ from models.sale import Sale, Base as SaleBase
 from models.seller import Seller, Base as SellerBase
 from repositories.sale_repository import SaleRepository
 from datetime import datetime
+import pandas as pd
 
 DATABASE_URL = "sqlite:///:memory:"
 
@@ -145,3 +146,132 @@ def test_get_sales_by_seller(repository, db):
     assert sales[0].date == datetime.strptime("2023-07-01 14:30:00", "%Y-%m-%d %H:%M:%S")
     assert sales[0].client_type == "Novo"
     assert sales[0].currency == "BRL"
+
+def test_save_sales_bulk(repository, db):
+    sales = pd.DataFrame({
+        'seller_cpf': ["04097026097"] * 5,
+        'value': [100.0, 200.0, 300.0, 400.0, 500.0],
+        'channel': ["Online", "Telefone", "Online", "Loja Física", "Online"],
+        'commission': [8.0, 20.0, 24.0, 40.0, 40.0],
+        'date': pd.to_datetime(["2023-07-0%d 14:30:00" % day for day in range(1, 6)]),
+        'client_type': ["Novo"] * 5,
+        'currency': ["BRL"] * 5
+    })
+
+    saved = repository.save_sales_bulk(sales, batch_size=2)
+
+    assert saved == 5
+    saved_sales = db.query(Sale).order_by(Sale.id).all()
+    assert [sale.value for sale in saved_sales] == [100.0, 200.0, 300.0, 400.0, 500.0]
+    assert saved_sales[0].date == datetime.strptime("2023-07-01 14:30:00", "%Y-%m-%d %H:%M:%S")
+
+def test_save_sales_bulk_is_atomic(repository, db):
+    sale_data = {
+        'seller_cpf': "04097026097",
+        'value': 1000.0,
+        'channel': "Online",
+        'commission': 80.0,
+        'date': datetime.strptime("2023-07-01 14:30:00", "%Y-%m-%d %H:%M:%S"),
+        'client_type': "Novo",
+        'currency': "BRL"
+    }
+    invalid_sale = dict(sale_data, value=None)
+
+    with pytest.raises(Exception):
+        repository.save_sales_bulk([sale_data, sale_data, invalid_sale], batch_size=2)
+
+    assert db.query(Sale).count() == 0
+
+def test_get_sales_totals_by(repository, db):
+    db.add(Seller(
+        name="Seller Test 1",
+        cpf="04097026097",
+        birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+        email="test1@seller.com",
+        state="SP"
+    ))
+    db.add(Seller(
+        name="Seller Test 2",
+        cpf="04097026098",
+        birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+        email="test2@seller.com",
+        state="RJ"
+    ))
+    db.commit()
+    repository.save_sales_bulk([
+        {'seller_cpf': "04097026097", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+         'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "04097026097", 'value': 500.0, 'channel': "Telefone", 'commission': 50.0,
+         'date': datetime(2023, 7, 2, 14, 30), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "04097026098", 'value': 2000.0, 'channel': "Online", 'commission': 160.0,
+         'date': datetime(2023, 7, 3, 14, 30), 'client_type': "Fidelizado", 'currency': "BRL"}
+    ])
+
+    by_channel = {row[0]: tuple(row[1:]) for row in repository.get_sales_totals_by('channel')}
+    by_state = {row[0]: tuple(row[1:]) for row in repository.get_sales_totals_by('state')}
+
+    assert by_channel == {"Online": (3000.0, 240.0, 2), "Telefone": (500.0, 50.0, 1)}
+    assert by_state == {"SP": (1500.0, 130.0, 2), "RJ": (2000.0, 160.0, 1)}
+
+def test_get_sales_page_by_seller(repository, db):
+    dates = ["2023-07-02 10:00:00", "2023-07-01 10:00:00", "2023-07-02 10:00:00", "2023-07-03 10:00:00"]
+    repository.save_sales_bulk([
+        {'seller_cpf': "04097026097", 'value': float(index), 'channel': "Online", 'commission': 0.0,
+         'date': datetime.strptime(date, "%Y-%m-%d %H:%M:%S"), 'client_type': "Novo", 'currency': "BRL"}
+        for index, date in enumerate(dates)
+    ])
+
+    first_page = repository.get_sales_page_by_seller("04097026097", 2)
+    last_sale = first_page[-1]
+    second_page = repository.get_sales_page_by_seller("04097026097", 2, after=(last_sale.date, last_sale.id))
+
+    assert [sale.value for sale in first_page] == [1.0, 0.0]
+    assert [sale.value for sale in second_page] == [2.0, 3.0]
+
+def test_get_sales_totals_with_filters(repository, db):
+    db.add(Seller(
+        name="Seller Test",
+        cpf="04097026097",
+        birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+        email="test@seller.com",
+        state="SP"
+    ))
+    db.commit()
+    repository.save_sales_bulk([
+        {'seller_cpf': "04097026097", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+         'date': datetime(2023, 6, 30, 23, 59), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "04097026097", 'value': 500.0, 'channel': "Online", 'commission': 40.0,
+         'date': datetime(2023, 7, 15, 10, 0), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "04097026097", 'value': 200.0, 'channel': "Telefone", 'commission': 20.0,
+         'date': datetime(2023, 7, 31, 23, 0), 'client_type': "Novo", 'currency': "USD"}
+    ])
+    july = {'date_from': datetime(2023, 7, 1), 'date_before': datetime(2023, 8, 1)}
+
+    by_channel = {row[0]: tuple(row[1:]) for row in repository.get_sales_totals_by('channel', july)}
+    assert by_channel == {"Online": (500.0, 40.0, 1), "Telefone": (200.0, 20.0, 1)}
+    assert tuple(repository.get_seller_sales_totals("04097026097", dict(july, currency="BRL"))) == (500.0, 40.0, 1)
+    assert tuple(repository.get_seller_sales_totals("04097026097", {'state': "RJ"})) == (0, 0, 0)
+    assert len(repository.get_sales_by_seller("04097026097", {'state': "SP", 'channel': "Online"})) == 2
+
+def test_save_sales_bulk_skips_stored_sales(repository, db):
+    db.add(Seller(
+        name="Seller Test",
+        cpf="04097026097",
+        birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+        email="test@seller.com",
+        state="SP"
+    ))
+    db.commit()
+    sale_data = {'seller_cpf': "04097026097", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+                 'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"}
+    other_sale = dict(sale_data, date=datetime(2023, 7, 2, 14, 30))
+
+    # Two equal sales in one upload are both real sales.
+    assert repository.save_sales_bulk([sale_data, sale_data, other_sale], batch_size=1) == 3
+    retried = pd.DataFrame([dict(sale_data, value=1000), other_sale, sale_data])
+    retried['date'] = pd.to_datetime(retried['date'])
+    assert repository.save_sales_bulk(retried) == 0
+    assert repository.save_sales_bulk([sale_data, sale_data, sale_data]) == 1
+
+    assert db.query(Sale).count() == 4
+    assert tuple(repository.aggregate_repository.get_seller_totals("04097026097")) == (4000.0, 320.0, 4)
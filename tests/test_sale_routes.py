@@ -1,3 +1,6 @@
+import json
+import os
+import time
 import pytest
 from io import BytesIO
 from flask import Flask
@@ -6,6 +9,7 @@ from models.sale import Base as SaleBase
 from models.seller import Base as SellerBase
 from controllers.sale_controller import app as sales_blueprint
 from controllers.seller_controller import app as sellers_blueprint
+from utils.response_cache import ResponseCache, summary_cache
 
 @pytest.fixture(scope='module')
 def test_app():
@@ -15,8 +19,7 @@ def test_app():
 
     with app.app_context():
         engine = SessionLocal().get_bind()
-        SaleBase.metadata.create_all(engine)
-        SellerBase.metadata.create_all(engine)
+        init_db()
 
     yield app
 
@@ -41,14 +44,27 @@ def create_seller(client):
 def test_calculate_commissions(client):
     create_seller(client)
     data = {
-        'file': (BytesIO(b"CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL"), 'sales.csv')
+        'file': (BytesIO(b"CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL"), 'route-test-sales.csv')
     }
     response = client.post('/commissions/calculate', content_type='multipart/form-data', data=data)
     assert response.status_code == 200
+    assert not os.path.exists('/tmp/route-test-sales.csv')
     json_data = response.get_json()
     assert "04097026097" in json_data
     assert json_data["04097026097"] == 80.0
 
+def test_get_sales_by_seller_as_ndjson(client):
+    response = client.get('/sales/04097026097', headers={'Accept': 'application/x-ndjson'})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert len(lines) == 1
+    assert lines[0]['seller_cpf'] == "04097026097"
+    assert lines[0]['commission'] == 80.0
+
+    response = client.get('/sales/04097026000?stream=1')
+    assert response.status_code == 404
+
 def test_get_sales_summary(client):
     response = client.get('/sales/summary')
     assert response.status_code == 200
@@ -57,6 +73,23 @@ def test_get_sales_summary(client):
     assert 'by_state' in json_data
     assert 'by_client_type' in json_data
 
+def test_get_sales_summary_with_filters(client):
+    response = client.get('/sales/summary?from=2023-07-01&to=2023-07-01&channel=Online')
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert json_data['by_channel']['Online']['count'] == 1
+    assert json_data['by_state']['SP']['total_value'] == 1000.0
+
+    response = client.get('/sales/summary?from=2023-07-02')
+    assert response.get_json()['by_channel'] == {}
+
+    response = client.get('/sales/summary/04097026097?currency=USD')
+    assert response.status_code == 200
+    assert response.get_json()['sales'] == []
+
+    response = client.get('/sales/summary?from=yesterday')
+    assert response.status_code == 400
+
 def test_get_sales_by_seller(client):
     response = client.get('/sales/04097026000')
     assert response.status_code == 404
@@ -64,3 +97,88 @@ def test_get_sales_by_seller(client):
 def test_get_summary_by_seller(client):
     response = client.get('/sales/summary/04097026000')
     assert response.status_code == 404
+
+def test_calculate_commissions_is_idempotent(client):
+    content = b"CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,300,Telefone,2023-07-05 10:00:00,Novo,BRL"
+
+    def upload(key=None):
+        headers = {'Idempotency-Key': key} if key else {}
+        data = {'file': (BytesIO(content), 'sales.csv')}
+        return client.post('/commissions/calculate', content_type='multipart/form-data', data=data, headers=headers)
+
+    response = upload('upload-1')
+    assert response.status_code == 200
+    assert (response.headers['X-Rows-Inserted'], response.headers['X-Rows-Skipped']) == ('1', '0')
+
+    replay = upload('upload-1')
+    assert replay.get_json() == response.get_json()
+    assert replay.headers['Idempotent-Replayed'] == 'true'
+    assert replay.headers['X-Rows-Inserted'] == '1'
+
+    retry = upload()
+    assert (retry.headers['X-Rows-Inserted'], retry.headers['X-Rows-Skipped']) == ('0', '1')
+    assert client.get('/sales/summary/04097026097').get_json()['total_value'] == 1300.0
+
+    assert upload('k' * 256).status_code == 400
+
+def test_calculate_commissions_rejects_mislabelled_upload(client):
+    data = {'file': (BytesIO(b"CPF,Valor\n04097026097,300"), 'sales.parquet', 'application/vnd.apache.parquet')}
+    response = client.post('/commissions/calculate', content_type='multipart/form-data', data=data)
+    assert response.status_code == 415
+    assert 'Content-Type' in response.get_json()['error']
+
+def test_sales_summary_is_cached_and_revalidated(client):
+    first = client.get('/sales/summary?channel=Online')
+    etag = first.headers['ETag']
+    assert first.headers['Last-Modified']
+
+    hits = summary_cache.metrics()['hits']
+    assert client.get('/sales/summary?channel=Online', headers={'If-None-Match': etag}).status_code == 304
+    assert summary_cache.metrics()['hits'] == hits + 1
+
+    data = {
+        'file': (BytesIO(b"CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,700,Online,2023-07-09 10:00:00,Novo,BRL"), 'sales.csv')
+    }
+    client.post('/commissions/calculate', content_type='multipart/form-data', data=data)
+    changed = client.get('/sales/summary?channel=Online', headers={'If-None-Match': etag})
+    assert changed.status_code == 200
+    assert changed.headers['ETag'] != etag
+    assert changed.get_json()['by_channel']['Online']['total_value'] == first.get_json()['by_channel']['Online']['total_value'] + 700
+
+    seller = client.get('/sales/summary/04097026097')
+    assert client.get('/sales/summary/04097026097', headers={'If-None-Match': seller.headers['ETag']}).status_code == 304
+    assert client.get('/sales/summary/04097026000').status_code == 404
+
+def test_summary_cache_is_bounded_by_body_size():
+    cache = ResponseCache(max_size=10, ttl=60, max_bytes=10, max_entry_bytes=6)
+
+    large = cache.put('large', 1, b'x' * 7)
+    assert large['etag'] and cache.get('large', 1) is None
+
+    cache.put('a', 1, b'aaaa')
+    cache.put('b', 1, b'bbbb')
+    cache.put('a', 1, b'aaaaa')
+    cache.put('c', 1, b'cccc')
+    assert cache.get('b', 1) is None
+    assert cache.get('a', 1)['body'] == b'aaaaa'
+    assert cache.metrics()['bytes'] == 9
+
+def test_calculate_commissions_as_background_job(client):
+    data = {
+        'file': (BytesIO(b"CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,500,Loja Fisica,2023-08-01 10:00:00,Novo,BRL"), 'sales.csv')
+    }
+    response = client.post('/commissions/calculate?async=1', content_type='multipart/form-data', data=data)
+    assert response.status_code == 202
+    job = response.get_json()
+    assert response.headers['Location'].endswith('/jobs/' + job['id'])
+
+    for _ in range(500):
+        job = client.get('/jobs/' + job['id']).get_json()
+        if job['status'] in ('succeeded', 'failed'):
+            break
+        time.sleep(0.01)
+    assert job['status'] == 'succeeded'
+    assert job['progress']['rows_saved'] == 1
+    assert job['result'] == {"04097026097": 50.0}
+
+    assert client.get('/jobs/unknown').status_code == 404
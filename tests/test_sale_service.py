@@ -1,5 +1,6 @@
 import sys
 import os
+import threading
 import pytest
 from unittest.mock import MagicMock
 from services.sale_service import SaleService
@@ -26,11 +27,8 @@ def test_calculate_commissions(sale_service):
     with open(file_path, "w") as f:
         f.write(csv_content)
     
-    sale_service.seller_repository.get_seller_by_cpf = MagicMock(side_effect=[
-        Seller(id=1, cpf="04097026097", name="Seller 1"),
-        Seller(id=2, cpf="04097026098", name="Seller 2")
-    ])
-    sale_service.sale_repository.save_sale = MagicMock()
+    sale_service.seller_repository.get_states_by_cpf = MagicMock(return_value={"04097026097": "SP", "04097026098": "RJ"})
+    sale_service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: set(sales['row_hash']))
     
     commissions = sale_service.calculate_commissions(file_path)
     
@@ -48,11 +46,8 @@ def test_calculate_commissions_with_errors(sale_service):
     with open(file_path, "w") as f:
         f.write(csv_content)
     
-    sale_service.seller_repository.get_seller_by_cpf = MagicMock(side_effect=[
-        Seller(id=1, cpf="04097026097", name="Seller 1"),
-        None
-    ])
-    sale_service.sale_repository.save_sale = MagicMock()
+    sale_service.seller_repository.get_states_by_cpf = MagicMock(return_value={"04097026097": "SP"})
+    sale_service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: set(sales['row_hash']))
     
     result = sale_service.calculate_commissions(file_path)
     
@@ -63,10 +58,13 @@ def test_calculate_commissions_with_errors(sale_service):
     assert "Seller with CPF 04097026098 does not exist" in result['errors'][0]
 
 def test_get_sales_summary(sale_service):
-    sale_service.sale_repository.get_sales_summary = MagicMock(return_value=[
-        ("04097026097", "Online", 1000.0, 80.0, "SP", "Novo"),
-        ("04097026098", "Loja Física", 2000.0, 200.0, "RJ", "Fidelizado")
-    ])
+    totals = {
+        'channel': [("Online", 1000.0, 80.0, 1), ("Loja Física", 2000.0, 200.0, 1)],
+        'state': [("SP", 1000.0, 80.0, 1), ("RJ", 2000.0, 200.0, 1)],
+        'client_type': [("Novo", 1000.0, 80.0, 1), ("Fidelizado", 2000.0, 200.0, 1)],
+        'seller': [("04097026097", 1000.0, 80.0, 1), ("04097026098", 2000.0, 200.0, 1)]
+    }
+    sale_service.aggregate_repository.get_totals = MagicMock(side_effect=lambda dimension: totals[dimension])
     
     summary = sale_service.get_sales_summary()
     assert summary == {
@@ -171,6 +169,7 @@ def test_get_summary_by_seller(sale_service):
             'currency': "BRL"
         }
     ])
+    sale_service.aggregate_repository.get_seller_totals = MagicMock(return_value=(1000.0, 80.0, 1))
     
     summary = sale_service.get_summary_by_seller("04097026097")
     
@@ -193,3 +192,111 @@ def test_get_summary_by_seller(sale_service):
             }
         ]
     }
+
+def test_calculate_commissions_in_chunks(sale_service):
+    csv_content = """CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda
+04097026097,5000,Loja Física,2023-07-01 14:30:00,Novo,BRL
+04097026098,1000,Online,2023-07-01 15:00:00,Fidelizado,BRL
+04097026000,1000,Online,2023-07-01 15:30:00,Fidelizado,BRL
+04097026097,5000,Telefone,2023-07-02 14:30:00,Novo,BRL
+"""
+    file_path = "/tmp/sales_in_chunks.csv"
+    with open(file_path, "w") as f:
+        f.write(csv_content)
+
+    sale_service.seller_repository.get_states_by_cpf = MagicMock(side_effect=lambda cpfs, **options: {cpf: "SP" for cpf in cpfs if cpf != "04097026000"})
+    sale_service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: set(sales['row_hash']))
+
+    result = sale_service.calculate_commissions(file_path, chunksize=1)
+
+    assert result['commissions'] == {
+        "04097026097": 900.0,
+        "04097026098": 80.0
+    }
+    assert result['errors'] == ["Seller with CPF 04097026000 does not exist for sale on 2023-07-01 15:30:00."]
+    # Three chunks bring new CPFs, and the states are read once more after
+    # the first insert.
+    assert sale_service.seller_repository.get_states_by_cpf.call_count == 4
+    assert sale_service.sale_repository.insert_sales.call_count == 4
+
+def test_calculate_commissions_caps_reported_errors(sale_service, monkeypatch):
+    csv_content = """CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda
+04097026000,1000,Online,2023-07-01 15:30:00,Fidelizado,BRL
+04097026097,5000,Telefone,2023-07-02 14:30:00,Novo,BRL
+04097026000,1000,Online,2023-07-03 15:30:00,Fidelizado,BRL
+04097026001,1000,Online,2023-07-04 15:30:00,Fidelizado,BRL
+"""
+    file_path = "/tmp/sales_with_many_errors.csv"
+    with open(file_path, "w") as f:
+        f.write(csv_content)
+
+    monkeypatch.setattr('services.sale_service.MAX_REPORTED_ERRORS', 2)
+    sale_service.seller_repository.get_states_by_cpf = MagicMock(side_effect=lambda cpfs, **options: {cpf: "SP" for cpf in cpfs if cpf == "04097026097"})
+    sale_service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: set(sales['row_hash']))
+    stats = {}
+
+    result = sale_service.calculate_commissions(file_path, chunksize=1, stats=stats)
+
+    assert result['errors'] == [
+        "Seller with CPF 04097026000 does not exist for sale on 2023-07-01 15:30:00.",
+        "Seller with CPF 04097026000 does not exist for sale on 2023-07-03 15:30:00."
+    ]
+    assert result['errors_omitted'] == 1
+    assert stats['rows_rejected'] == 3
+
+def test_calculate_commissions_takes_the_write_lock_only_to_persist(sale_service):
+    file_path = "/tmp/sales_write_lock.csv"
+    with open(file_path, "w") as f:
+        f.write("CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL\n")
+
+    write_lock = threading.Lock()
+    write_lock.acquire()
+    validated = threading.Event()
+
+    def get_states_by_cpf(cpfs, **options):
+        validated.set()
+        return dict.fromkeys(cpfs, "SP")
+
+    sale_service.seller_repository.get_states_by_cpf = MagicMock(side_effect=get_states_by_cpf)
+    sale_service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: set(sales['row_hash']))
+    upload = threading.Thread(target=sale_service.calculate_commissions, args=(file_path,), kwargs={'write_lock': write_lock})
+    upload.start()
+
+    assert validated.wait(5)
+    upload.join(0.2)
+    assert upload.is_alive()
+    assert sale_service.sale_repository.insert_sales.call_count == 0
+
+    write_lock.release()
+    upload.join(5)
+    assert sale_service.sale_repository.insert_sales.call_count == 1
+    assert write_lock.acquire(blocking=False)
+
+def test_calculate_commissions_covers_only_stored_sales(sale_service):
+    file_path = "/tmp/sales_stored_twice.csv"
+    with open(file_path, "w") as f:
+        f.write("""CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda
+04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL
+04097026098,2000,Loja Física,2023-07-01 15:00:00,Fidelizado,BRL
+04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL
+""")
+
+    stored = set()
+
+    def insert_sales(sales, **options):
+        inserted = set(sales['row_hash']) - stored
+        stored.update(inserted)
+        return inserted
+
+    sale_service.seller_repository.get_states_by_cpf = MagicMock(side_effect=lambda cpfs, **options: dict.fromkeys(cpfs, "SP"))
+    sale_service.sale_repository.insert_sales = MagicMock(side_effect=insert_sales)
+    stats = {}
+
+    assert sale_service.calculate_commissions(file_path, chunksize=1, stats=stats) == {
+        "04097026097": 160.0,
+        "04097026098": 200.0
+    }
+    assert (stats['rows_saved'], stats['rows_skipped']) == (3, 0)
+
+    assert sale_service.calculate_commissions(file_path, chunksize=2, stats=stats) == {}
+    assert (stats['rows_saved'], stats['rows_skipped']) == (0, 3)
@@ -0,0 +1,188 @@
+import pytest
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import sessionmaker
+from models.sale import Sale
+from models.seller import Seller, Base
+from models.sales_aggregate import SalesAggregate
+from repositories.sale_repository import SaleRepository
+from repositories.sales_aggregate_repository import SalesAggregateRepository
+from services.sale_service import SaleService
+from services.seller_service import SellerService
+from datetime import datetime
+from unittest.mock import MagicMock
+
+DATABASE_URL = "sqlite:///:memory:"
+
+@pytest.fixture
+def db():
+    engine = create_engine(DATABASE_URL)
+    Session = sessionmaker(bind=engine)
+    Base.metadata.create_all(engine)
+    session = Session()
+    yield session
+    session.close()
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def repository(db):
+    return SalesAggregateRepository(db)
+
+@pytest.fixture
+def sellers(db):
+    for cpf, state in (("04097026097", "SP"), ("04097026098", "RJ")):
+        db.add(Seller(
+            name="Seller " + cpf,
+            cpf=cpf,
+            birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+            email=cpf + "@seller.com",
+            state=state
+        ))
+    db.commit()
+    SaleRepository(db).save_sales_bulk([
+        {'seller_cpf': "04097026097", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+         'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "04097026097", 'value': 500.0, 'channel': "Telefone", 'commission': 50.0,
+         'date': datetime(2023, 7, 2, 14, 30), 'client_type': "Novo", 'currency': "BRL"},
+        {'seller_cpf': "04097026098", 'value': 2000.0, 'channel': "Online", 'commission': 160.0,
+         'date': datetime(2023, 7, 3, 14, 30), 'client_type': "Fidelizado", 'currency': "BRL"},
+        {'seller_cpf': "04097026000", 'value': 300.0, 'channel': "Online", 'commission': 24.0,
+         'date': datetime(2023, 7, 3, 15, 30), 'client_type': "Novo", 'currency': "BRL"}
+    ])
+
+def totals(repository, dimension):
+    return {key: (total_value, total_commission, count) for key, total_value, total_commission, count in repository.get_totals(dimension)}
+
+def test_bulk_insert_updates_aggregates(repository, sellers):
+    assert totals(repository, 'channel') == {"Online": (3000.0, 240.0, 2), "Telefone": (500.0, 50.0, 1)}
+    assert totals(repository, 'state') == {"SP": (1500.0, 130.0, 2), "RJ": (2000.0, 160.0, 1)}
+    assert totals(repository, 'client_type') == {"Novo": (1500.0, 130.0, 2), "Fidelizado": (2000.0, 160.0, 1)}
+    assert repository.get_seller_totals("04097026097") == (1500.0, 130.0, 2)
+    assert repository.get_seller_totals("04097026000") is None
+
+def test_bulk_insert_updates_aggregates_once_with_the_given_states(db, repository, sellers):
+    sale_repository = SaleRepository(db)
+    aggregates = sale_repository.aggregate_repository
+    aggregates.add_sales = MagicMock(wraps=aggregates.add_sales)
+    aggregates.seller_repository.get_states_by_cpf = MagicMock(wraps=aggregates.seller_repository.get_states_by_cpf)
+    sales = [
+        {'seller_cpf': "04097026098", 'value': value, 'channel': "Telefone", 'commission': value / 10,
+         'date': datetime(2023, 7, 4, 14, 30), 'client_type': "Novo", 'currency': "BRL"}
+        for value in (100.0, 200.0, 1000.0)
+    ]
+
+    assert sale_repository.save_sales_bulk(sales, batch_size=1) == 3
+    assert sale_repository.save_sales_bulk(sales[:2], batch_size=1) == 0
+
+    sale_repository.insert_sales(sales + [dict(sales[0], value=50.0)], states={"04097026098": "MG"})
+
+    # One update per call; a call without states looks them up, once.
+    assert aggregates.add_sales.call_count == 2
+    assert aggregates.seller_repository.get_states_by_cpf.call_count == 1
+    assert totals(repository, 'state')["MG"] == (50.0, 10.0, 1)
+
+def test_seller_state_change_moves_state_totals(db, repository, sellers):
+    seller = db.query(Seller).filter(Seller.cpf == "04097026097").first()
+
+    SellerService(db).update_seller(seller.id, {'state': "RJ"})
+
+    assert totals(repository, 'state') == {"RJ": (3500.0, 290.0, 3)}
+
+def test_upload_counts_sales_under_a_state_changed_after_validation(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sales.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    db = Session()
+    seller = Seller(name="Seller", cpf="04097026097", birth_date=datetime(2000, 1, 1).date(),
+                    email="seller@seller.com", state="SP")
+    db.add(seller)
+    db.commit()
+    seller_id = seller.id
+    sales_path = tmp_path / 'sales.csv'
+    sales_path.write_text(
+        "CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n"
+        "04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL\n"
+        "04097026097,500,Online,2023-07-02 14:30:00,Novo,BRL\n"
+    )
+    service = SaleService(db)
+    get_states_by_cpf = service.seller_repository.get_states_by_cpf
+
+    def read_then_move_seller(cpfs, **options):
+        states = get_states_by_cpf(cpfs, **options)
+        if service.seller_repository.get_states_by_cpf.call_count == 1:
+            # Another request moves the seller before the upload writes.
+            other = Session()
+            SellerService(other).update_seller(seller_id, {'state': "RJ"})
+            other.close()
+        return states
+
+    service.seller_repository.get_states_by_cpf = MagicMock(side_effect=read_then_move_seller)
+    service.calculate_commissions(str(sales_path), chunksize=1, workers=1)
+
+    assert totals(SalesAggregateRepository(db), 'state') == {"RJ": (1500.0, 120.0, 2)}
+    db.close()
+    engine.dispose()
+
+def test_seller_update_ignores_stale_cached_seller(db, repository, sellers):
+    service = SellerService(db)
+    seller = db.query(Seller).filter(Seller.cpf == "04097026097").first()
+    service.repository.get_seller_by_id(seller.id)
+    # Another process moves the seller to MG; this process's cache still says SP.
+    db.execute(text("UPDATE sellers SET state = 'MG' WHERE cpf = '04097026097'"))
+    repository.move_seller_state("04097026097", "SP", "MG")
+    db.commit()
+
+    service.update_seller(seller.id, {'state': "RJ"})
+
+    assert totals(repository, 'state') == {"RJ": (3500.0, 290.0, 3)}
+
+def test_seller_with_sales_is_not_deleted(db, repository, sellers):
+    seller = db.query(Seller).filter(Seller.cpf == "04097026098").first()
+
+    assert SellerService(db).delete_seller(seller.id) == {"error": "Seller has sales and cannot be deleted"}
+
+    assert db.query(Seller).filter(Seller.cpf == "04097026098").count() == 1
+    assert db.query(Sale).filter(Sale.seller_cpf == "04097026098").count() == 1
+    assert totals(repository, 'state') == {"SP": (1500.0, 130.0, 2), "RJ": (2000.0, 160.0, 1)}
+
+def test_rebuild_sales_aggregates(db, repository, sellers):
+    service = SaleService(db)
+    assert service.rebuild_sales_aggregates(repair=False) == []
+
+    db.query(SalesAggregate).filter(SalesAggregate.key == "Online").update({'count': 7})
+    db.commit()
+
+    mismatches = service.rebuild_sales_aggregates()
+
+    assert mismatches == [{'dimension': 'channel', 'key': "Online", 'expected': (3000.0, 240.0, 2), 'stored': (3000.0, 240.0, 7)}]
+    assert service.rebuild_sales_aggregates(repair=False) == []
+
+def test_seller_cpf_change_and_delete_with_enforced_foreign_key():
+    engine = create_engine(DATABASE_URL)
+    # SQLite only checks the key when asked to, as PostgreSQL always does.
+    event.listen(engine, 'connect', lambda connection, record: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    repository = SalesAggregateRepository(db)
+    seller = Seller(name="Seller", cpf="04097026097", birth_date=datetime(2000, 1, 1).date(),
+                    email="seller@seller.com", state="SP")
+    db.add(seller)
+    db.commit()
+    SaleRepository(db).save_sales_bulk([
+        {'seller_cpf': "04097026097", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+         'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"}
+    ])
+
+    SellerService(db).update_seller(seller.id, {'cpf': "52998224725"})
+
+    assert [sale.seller_cpf for sale in db.query(Sale)] == ["52998224725"]
+    assert repository.get_seller_totals("52998224725") == (1000.0, 80.0, 1)
+    assert repository.get_seller_totals("04097026097") is None
+    assert totals(repository, 'channel') == {"Online": (1000.0, 80.0, 1)}
+    assert SaleService(db).rebuild_sales_aggregates(repair=False) == []
+
+    assert SellerService(db).delete_seller(seller.id) == {"error": "Seller has sales and cannot be deleted"}
+
+    assert [sale.seller_cpf for sale in db.query(Sale)] == ["52998224725"]
+    assert totals(repository, 'channel') == {"Online": (1000.0, 80.0, 1)}
+    db.close()
+    engine.dispose()
@@ -1,7 +1,8 @@
 import pytest
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from models.seller import Seller, Base
+from repositories.seller_cache import SellerCache, seller_cache
 from repositories.seller_repository import SellerRepository
 from datetime import datetime
 
@@ -115,3 +116,96 @@ def test_get_all_sellers(repository):
     assert len(sellers) >= 2
     assert sellers[0].name == "Nome1"
     assert sellers[1].name == "Nome2"
+
+def test_get_existing_cpfs(repository):
+    seller = Seller(
+        name="Nome3",
+        cpf="04097026103",
+        birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+        email="ccc@ccc.com",
+        state="SP"
+    )
+    repository.create_seller(seller)
+    cpfs = ["04097026103"] + [str(n).zfill(11) for n in range(2000)]
+    existing_cpfs = repository.get_existing_cpfs(cpfs)
+    assert existing_cpfs == {"04097026103"}
+
+def test_get_sellers_page(repository):
+    for index, cpf in enumerate(["04097026104", "04097026105", "04097026106"]):
+        repository.create_seller(Seller(
+            name=f"Pagina{index}",
+            cpf=cpf,
+            birth_date=datetime.strptime("01/01/2000", "%d/%m/%Y").date(),
+            email=f"page{index}@aaa.com",
+            state="SP"
+        ))
+    first_page = repository.get_sellers_page(2)
+    second_page = repository.get_sellers_page(2, after_id=first_page[-1].id)
+    assert [seller.name for seller in first_page] == ["Pagina0", "Pagina1"]
+    assert [seller.name for seller in second_page] == ["Pagina2"]
+
+def test_upsert_sellers_bulk(repository):
+    repository.create_seller(Seller(
+        name="Antigo",
+        cpf="25653370002",
+        birth_date=datetime.strptime("01/01/1980", "%d/%m/%Y").date(),
+        email="antigo@aaa.com",
+        state="RJ"
+    ))
+    sellers = [
+        {'cpf': "25653370002", 'name': "Alice Silva", 'birth_date': datetime(1980, 1, 1).date(),
+         'email': "alice.silva@example.com", 'state': "SP"},
+        {'cpf': "83177313083", 'name': "Bruno Costa", 'birth_date': datetime(1985, 5, 15).date(),
+         'email': "bruno.costa@example.com", 'state': "RJ"},
+        {'cpf': "20122296036", 'name': "Carla Souza", 'birth_date': datetime(1990, 3, 22).date(),
+         'email': "carla.souza@example.com", 'state': "MG"}
+    ]
+
+    assert repository.upsert_sellers_bulk(sellers, batch_size=2) == 3
+
+    updated_seller = repository.get_seller_by_cpf("25653370002")
+    assert updated_seller.name == "Alice Silva"
+    assert updated_seller.state == "SP"
+    assert repository.get_seller_by_cpf("20122296036").email == "carla.souza@example.com"
+    assert repository.get_states_by_cpf(["25653370002", "83177313083"]) == {"25653370002": "SP", "83177313083": "RJ"}
+
+def test_seller_lookups_are_cached_and_invalidated(repository, db):
+    repository.create_seller(Seller(name="Seller", cpf="04097026097", birth_date=datetime(2000, 1, 1).date(),
+                                    email="a@a.com", state="SP"))
+    db.expire_all()
+    before = seller_cache.metrics()
+
+    seller = repository.get_seller_by_cpf("04097026097")
+    statements = []
+    event.listen(db.get_bind(), 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    assert repository.get_seller_by_id(seller.id).cpf == "04097026097"
+    assert repository.get_seller_by_cpf("04097026097").state == "SP"
+    assert statements == []
+
+    seller.state = "RJ"
+    repository.update_seller(seller)
+    assert repository.get_seller_by_cpf("04097026097").state == "RJ"
+    repository.delete_seller(repository.get_seller_by_id(seller.id))
+    assert repository.get_seller_by_cpf("04097026097") is None
+
+    after = seller_cache.metrics()
+    assert after['hits'] - before['hits'] >= 2
+    assert after['misses'] - before['misses'] >= 3
+
+def test_seller_cache_evicts_and_expires(db):
+    sellers = [Seller(name="Seller", cpf=cpf, birth_date=datetime(2000, 1, 1).date(), email="a@a.com", state="SP")
+               for cpf in ("04097026097", "25653370002", "83177313083")]
+    db.add_all(sellers)
+    db.commit()
+    cache = SellerCache(max_size=2, ttl=60)
+
+    for seller in sellers:
+        cache.put(db, seller)
+    assert cache.get(db, 'cpf', "04097026097") is None
+    assert cache.get(db, 'id', sellers[2].id).cpf == "83177313083"
+    assert cache.metrics()['evictions'] == 1
+
+    expiring = SellerCache(max_size=2, ttl=-1)
+    expiring.put(db, sellers[0])
+    assert expiring.get(db, 'id', sellers[0].id) is None
+    assert expiring.metrics()['expirations'] == 1
@@ -3,6 +3,8 @@ from flask import Flask
 from database.database import init_db, SessionLocal
 from models.seller import Base as SellerBase
 from controllers.seller_controller import app as sellers_blueprint
+from repositories.sale_repository import SaleRepository
+from datetime import datetime
 
 @pytest.fixture(scope='module')
 def test_app():
@@ -11,7 +13,7 @@ def test_app():
 
     with app.app_context():
         engine = SessionLocal().get_bind()
-        SellerBase.metadata.create_all(engine)
+        init_db()
 
     yield app
 
@@ -61,3 +63,49 @@ def test_delete_seller(client):
     assert response.status_code == 204
     response = client.get('/sellers/1')
     assert response.status_code == 404
+
+def test_get_all_sellers_paginated(client):
+    for cpf, email in (("25653370002", "alice@aaa.com"), ("83177313083", "bruno@aaa.com")):
+        client.post('/sellers', json={
+            "name": "Paginado",
+            "cpf": cpf,
+            "birth_date": "01/01/2000",
+            "email": email,
+            "state": "SP"
+        })
+
+    response = client.get('/sellers?limit=1')
+    assert response.status_code == 200
+    first_page = response.get_json()
+    assert len(first_page['items']) == 1
+    assert first_page['next_cursor']
+
+    response = client.get('/sellers?limit=1&after=' + first_page['next_cursor'])
+    second_page = response.get_json()
+    assert second_page['items'][0]['cpf'] != first_page['items'][0]['cpf']
+    assert second_page['next_cursor'] is None
+
+    response = client.get('/sellers?after=not-a-cursor')
+    assert response.status_code == 400
+
+def test_delete_seller_with_sales_conflicts(client):
+    response = client.post('/sellers', json={
+        "name": "Com vendas",
+        "cpf": "52998224725",
+        "birth_date": "01/01/2000",
+        "email": "vendas@aaa.com",
+        "state": "SP"
+    })
+    seller_id = response.get_json()['id']
+    db = SessionLocal()
+    SaleRepository(db).save_sales_bulk([
+        {'seller_cpf': "52998224725", 'value': 1000.0, 'channel': "Online", 'commission': 80.0,
+         'date': datetime(2023, 7, 1, 14, 30), 'client_type': "Novo", 'currency': "BRL"}
+    ])
+    db.close()
+
+    response = client.delete(f'/sellers/{seller_id}')
+
+    assert response.status_code == 409
+    assert response.get_json() == {"error": "Seller has sales and cannot be deleted"}
+    assert client.get(f'/sellers/{seller_id}').status_code == 200
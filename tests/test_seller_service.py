@@ -52,7 +52,7 @@ def test_update_seller():
     service = SellerService(db)
     
     existing_seller = Seller(id=1, name="Existing name", cpf="04097026097", birth_date=date(2000, 1, 1), email="existing@aaa.com", state="SP")
-    service.repository.get_seller_by_id = MagicMock(return_value=existing_seller)
+    service.repository.get_seller_for_update = MagicMock(return_value=existing_seller)
     service.repository.update_seller = MagicMock(return_value=existing_seller)
 
     update_data = {
@@ -69,7 +69,7 @@ def test_update_seller_invalid_cpf():
     service = SellerService(db)
     
     existing_seller = Seller(id=1, name="Existing name", cpf="04097026097", birth_date=date(2000, 1, 1), email="existing@aaa.com", state="SP")
-    service.repository.get_seller_by_id = MagicMock(return_value=existing_seller)
+    service.repository.get_seller_for_update = MagicMock(return_value=existing_seller)
 
     update_data = {
         "cpf": "12345678901"
@@ -85,7 +85,7 @@ def test_delete_seller():
     service = SellerService(db)
     
     existing_seller = Seller(id=1, name="Existing name", cpf="04097026097", birth_date=date(2000, 1, 1), email="existing@aaa.com", state="SP")
-    service.repository.get_seller_by_id = MagicMock(return_value=existing_seller)
+    service.repository.get_seller_for_update = MagicMock(return_value=existing_seller)
     service.repository.delete_seller = MagicMock(return_value=True)
 
     success = service.delete_seller(1)
@@ -96,8 +96,9 @@ def test_load_sellers_from_csv():
     db = MagicMock()
     service = SellerService(db)
 
-    service.repository.get_seller_by_cpf = MagicMock(return_value=None)
-    service.repository.create_seller = MagicMock()
+    service.repository.get_states_by_cpf = MagicMock(return_value={})
+    service.repository.upsert_sellers_bulk = MagicMock()
+    service.sale_repository.get_cpfs_with_sales = MagicMock(return_value=set())
 
     csv_content = """Nome,CPF,Data de Nascimento,Email,Estado
 Alice Silva,25653370002,01/01/1980,alice.silva@example.com,SP
@@ -110,3 +111,35 @@ Bruno Costa,83177313083,15/05/1985,bruno.costa@example.com,RJ
     result = service.load_sellers_from_csv("/tmp/sellers.csv")
     assert "errors" not in result
     assert result["message"] == "Sellers loaded successfully"
+    sellers = service.repository.upsert_sellers_bulk.call_args[0][0]
+    assert [seller["cpf"] for seller in sellers] == ["25653370002", "83177313083"]
+    assert sellers[1]["birth_date"] == date(1985, 5, 15)
+
+def test_load_sellers_from_csv_with_errors():
+    db = MagicMock()
+    service = SellerService(db)
+
+    service.repository.get_states_by_cpf = MagicMock(return_value={"25653370002": "RJ"})
+    service.repository.upsert_sellers_bulk = MagicMock()
+    service.aggregate_repository.move_seller_state = MagicMock()
+    service.sale_repository.get_cpfs_with_sales = MagicMock(return_value=set())
+
+    csv_content = """Nome,CPF,Data de Nascimento,Email,Estado
+Alice Silva,25653370002,01/01/1980,alice.silva@example.com,SP
+Bruno Costa,12345678901,15/05/1985,bruno.costa@example.com,RJ
+Carla Souza,20122296036,22/03/1990,carla.souza,MG
+Daniel Almeida,88257541087,30/07/1975,daniel.almeida@example.com,XX
+"""
+
+    with open("/tmp/sellers_with_errors.csv", "w") as f:
+        f.write(csv_content)
+
+    result = service.load_sellers_from_csv("/tmp/sellers_with_errors.csv")
+    assert result["errors"] == [
+        "Invalid CPF: 12345678901",
+        "Invalid email: carla.souza",
+        "Invalid state abbreviation: XX"
+    ]
+    service.aggregate_repository.move_seller_state.assert_called_once_with("25653370002", "RJ", "SP")
+    sellers = service.repository.upsert_sellers_bulk.call_args[0][0]
+    assert [seller["cpf"] for seller in sellers] == ["25653370002"]
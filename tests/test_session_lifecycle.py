@@ -0,0 +1,89 @@
+import gc
+from io import BytesIO
+import pytest
+from flask import Flask
+from sqlalchemy.orm import Session
+from database.database import Base, close_db, engine, get_pool_metrics, init_db
+from controllers.health_controller import app as health_blueprint
+from controllers.sale_controller import app as sales_blueprint
+from controllers.seller_controller import app as sellers_blueprint
+
+@pytest.fixture(scope='module')
+def test_app():
+    app = Flask(__name__)
+    app.register_blueprint(sales_blueprint, url_prefix='/')
+    app.register_blueprint(sellers_blueprint, url_prefix='/')
+    app.register_blueprint(health_blueprint, url_prefix='/')
+    init_db()
+
+    yield app
+
+    Base.metadata.drop_all(engine)
+
+@pytest.fixture
+def client(test_app):
+    return test_app.test_client()
+
+def live_sessions():
+    gc.collect()
+    return sum(1 for obj in gc.get_objects() if isinstance(obj, Session))
+
+def test_session_teardown_is_registered_once(test_app):
+    assert test_app.teardown_appcontext_funcs.count(close_db) == 1
+
+def test_sessions_are_closed_after_each_request(client):
+    client.post('/sellers', json={
+        "name": "Soak",
+        "cpf": "04097026097",
+        "birth_date": "01/01/2000",
+        "email": "soak@aaa.com",
+        "state": "SP"
+    })
+    baseline_sessions = live_sessions()
+
+    for iteration in range(5):
+        for _ in range(60):
+            assert client.get('/sellers').status_code == 200
+            assert client.get('/sales/summary').status_code == 200
+            assert client.get('/sellers/cpf/04097026097').status_code == 200
+            with client.get('/sales/04097026097?stream=1') as response:
+                assert response.status_code == 200
+                response.get_data()
+        assert get_pool_metrics()['checked_out'] == 0
+        assert live_sessions() <= baseline_sessions
+
+def test_pool_metrics_endpoint(client):
+    response = client.get('/health/db')
+    assert response.status_code == 200
+    json_data = response.get_json()
+    assert json_data['checked_out'] == 0
+    assert json_data['size'] >= 1
+
+def test_cache_metrics_endpoint(client):
+    client.get('/sellers/cpf/04097026097')
+    response = client.get('/health/cache')
+    assert response.status_code == 200
+    metrics = response.get_json()['sellers']
+    assert metrics['hits'] + metrics['misses'] >= 1
+    assert metrics['max_size'] > 0
+
+def test_request_timing_and_metrics(client):
+    data = {
+        'file': (BytesIO(b"CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL\n"
+                         b"04097026000,50,Online,2023-07-01 15:30:00,Novo,BRL"), 'sales.csv')
+    }
+    response = client.post('/commissions/calculate', content_type='multipart/form-data', data=data)
+
+    timing = dict(entry.split(';', 1) for entry in response.headers['Server-Timing'].split(', '))
+    assert {'receive', 'parse', 'validate', 'compute', 'persist', 'serialize', 'db', 'total'} <= set(timing)
+    assert 'queries' in timing['db']
+
+    metrics = client.get('/metrics')
+    assert metrics.mimetype == 'text/plain'
+    text = metrics.get_data(as_text=True)
+    endpoint = 'endpoint="POST /commissions/calculate"'
+    assert f'http_requests_total{{{endpoint},status="200"}}' in text
+    assert f'request_phase_seconds_count{{{endpoint},phase="persist"}}' in text
+    assert f'rows_processed_total{{{endpoint},kind="rejected"}} 1' in text
+    assert f'db_queries_total{{{endpoint}}}' in text
+    assert 'cache_events{cache="sellers",event="hits"}' in text
@@ -0,0 +1,138 @@
+import io
+from unittest.mock import MagicMock
+import pandas as pd
+import pytest
+from services.sale_service import SaleService
+from tests.test_commission_engine import random_sales
+from utils.upload_formats import (
+    ARROW_FILE, ARROW_STREAM, CSV, PARQUET, UploadFormatError, detect_format, iter_columnar_frames
+)
+
+
+def test_detect_format_from_magic_bytes_and_content_type(tmp_path):
+    parquet = tmp_path / 'sales.bin'
+    parquet.write_bytes(b'PAR1' + b'\0' * 16)
+
+    assert detect_format(str(parquet)) == PARQUET
+    assert detect_format(io.BytesIO(b'ARROW1\0\0')) == ARROW_FILE
+    assert detect_format(io.BytesIO(b'\xff\xff\xff\xff\x10\0\0\0')) == ARROW_STREAM
+    assert detect_format(io.BytesIO(b'CPF,Valor\n')) == CSV
+    assert detect_format(io.StringIO('CPF,Valor\n')) == CSV
+    assert detect_format(io.BytesIO(b'PAR1'), 'text/csv') == PARQUET
+    assert detect_format(io.BytesIO(b'\x10\0\0\0'), 'application/vnd.apache.arrow.stream') == ARROW_STREAM
+    with pytest.raises(UploadFormatError, match='does not match'):
+        detect_format(io.BytesIO(b'CPF,Valor\n'), 'application/vnd.apache.parquet')
+
+    source = io.BytesIO(b'PAR1')
+    source.seek(2)
+    detect_format(source)
+    assert source.tell() == 2
+
+
+def run_commissions(path, known_cpfs):
+    service = SaleService(MagicMock())
+    service.seller_repository.get_states_by_cpf = MagicMock(side_effect=lambda cpfs, **options: dict.fromkeys(known_cpfs & set(cpfs), "SP"))
+    saved = []
+    service.sale_repository.insert_sales = MagicMock(side_effect=lambda sales, **options: saved.append(sales) or set(sales['row_hash']))
+    stats = {}
+    return service.calculate_commissions(str(path), chunksize=400, stats=stats, workers=1), stats, saved
+
+
+@pytest.mark.parametrize('file_format', [PARQUET, ARROW_FILE, ARROW_STREAM])
+def test_columnar_uploads_match_csv(tmp_path, file_format):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.ipc
+    import pyarrow.parquet
+
+    df = random_sales(1500)
+    df.loc[::9, 'CPF'] = '00000000000'
+    # CPFs written as integers in the columnar file come back zero-padded.
+    df.loc[1::9, 'CPF'] = '04097026097'
+    known_cpfs = set(df['CPF']) - {'00000000000'}
+    csv_path = tmp_path / 'sales.csv'
+    df.to_csv(csv_path, index=False)
+
+    columns = df.assign(CPF=df['CPF'].astype('int64'), Data=pd.to_datetime(df['Data']), Extra=1)
+    table = pa.Table.from_pandas(columns, preserve_index=False)
+    path = tmp_path / 'sales.columnar'
+    if file_format == PARQUET:
+        pyarrow.parquet.write_table(table, path, row_group_size=500)
+    else:
+        open_writer = pyarrow.ipc.new_file if file_format == ARROW_FILE else pyarrow.ipc.new_stream
+        with open_writer(str(path), table.schema) as writer:
+            writer.write_table(table, max_chunksize=500)
+
+    expected, expected_stats, expected_saved = run_commissions(csv_path, known_cpfs)
+    result, stats, saved = run_commissions(path, known_cpfs)
+
+    assert result == expected
+    assert stats == expected_stats
+    pd.testing.assert_series_equal(
+        pd.concat(saved)['row_hash'].reset_index(drop=True),
+        pd.concat(expected_saved)['row_hash'].reset_index(drop=True)
+    )
+
+
+def test_missing_and_invalid_dates_are_rejected_rows(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    csv_path = tmp_path / 'sales.csv'
+    csv_path.write_text(
+        "CPF,Valor,Canal de Venda,Data,Tipo de Cliente,Moeda\n"
+        "04097026097,1000,Online,2023-07-01 14:30:00,Novo,BRL\n"
+        "04097026097,500,Online,,Novo,BRL\n"
+        "04097026097,500,Online,01/07/2023,Novo,BRL\n"
+    )
+    parquet_path = tmp_path / 'sales.parquet'
+    pyarrow.parquet.write_table(pa.table({
+        'CPF': ["04097026097", "04097026097"],
+        'Valor': [1000.0, 500.0],
+        'Canal de Venda': ["Online", "Online"],
+        'Data': pa.array([pd.Timestamp("2023-07-01 14:30:00"), None], pa.timestamp('us')),
+        'Tipo de Cliente': ["Novo", "Novo"],
+        'Moeda': ["BRL", "BRL"]
+    }), parquet_path)
+
+    csv_result, csv_stats, _ = run_commissions(csv_path, {"04097026097"})
+    parquet_result, parquet_stats, saved = run_commissions(parquet_path, {"04097026097"})
+
+    assert csv_result['errors'] == [
+        "Sale for seller with CPF 04097026097 has no date.",
+        "Sale for seller with CPF 04097026097 has an invalid date: 01/07/2023."
+    ]
+    assert parquet_result['errors'] == ["Sale for seller with CPF 04097026097 has no date."]
+    assert csv_result['commissions'] == parquet_result['commissions'] == {"04097026097": 80.0}
+    assert (csv_stats['rows_rejected'], parquet_stats['rows_rejected']) == (2, 1)
+    assert pd.concat(saved)['date'].notna().all()
+
+
+def test_columnar_frames_are_projected_and_typed(tmp_path):
+    pa = pytest.importorskip('pyarrow')
+    import pyarrow.parquet
+
+    path = tmp_path / 'sellers.parquet'
+    pyarrow.parquet.write_table(pa.table({'CPF': [1, 2], 'Valor': [10, 20], 'Unused': ['a', 'b']}), path)
+
+    frames = list(iter_columnar_frames(str(path), PARQUET, {'CPF': 'string', 'Valor': 'float64'}))
+
+    assert list(frames[0].columns) == ['CPF', 'Valor']
+    assert frames[0]['Valor'].dtype == 'float64'
+    assert frames[0]['CPF'].tolist() == ['1', '2']
+    padded = next(iter_columnar_frames(str(path), PARQUET, {'CPF': 'string'}, zero_pad={'CPF': 11}))
+    assert padded['CPF'].tolist() == ['00000000001', '00000000002']
+    with pytest.raises(UploadFormatError, match='Missing columns: Moeda'):
+        list(iter_columnar_frames(str(path), PARQUET, {'CPF': 'string', 'Moeda': 'string'}))
+
+
+def test_columnar_uploads_need_pyarrow(tmp_path):
+    try:
+        import pyarrow  # noqa: F401
+        pytest.skip('pyarrow is installed')
+    except ImportError:
+        pass
+    path = tmp_path / 'sales.parquet'
+    path.write_bytes(b'PAR1' + b'\0' * 16)
+
+    with pytest.raises(UploadFormatError, match='require pyarrow'):
+        run_commissions(path, set())
@@ -0,0 +1,21 @@
+from io import BytesIO
+from flask import Flask, jsonify, request
+from utils.uploads import UploadRequest
+
+
+def test_uploads_are_spooled_without_named_files(monkeypatch):
+    monkeypatch.setattr('utils.uploads.UPLOAD_SPOOL_BYTES', 1024)
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+
+    @app.route('/upload', methods=['POST'])
+    def upload():
+        stream = request.files['file'].stream
+        return jsonify(rolled=stream._rolled, content=len(stream.read()))
+
+    client = app.test_client()
+    small = client.post('/upload', data={'file': (BytesIO(b'x' * 100), 'sales.csv')})
+    large = client.post('/upload', data={'file': (BytesIO(b'x' * 4096), 'sales.csv')})
+
+    assert small.get_json() == {'rolled': False, 'content': 100}
+    assert large.get_json() == {'rolled': True, 'content': 4096}
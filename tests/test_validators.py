@@ -0,0 +1,43 @@
+import random
+import re
+from utils.document_utils import are_valid_cpfs, is_valid_cpf
+from utils.email_utils import are_valid_emails, is_valid_email
+
+
+def reference_is_valid_cpf(cpf):
+    cpf = ''.join(filter(str.isdigit, cpf))
+    if len(cpf) != 11 or len(set(cpf)) == 1:
+        return False
+    for digit in [9, 10]:
+        factor = 10 if digit == 9 else 11
+        remainder = sum(int(cpf[i]) * (factor - i) for i in range(digit)) % 11
+        if (0 if remainder < 2 else 11 - remainder) != int(cpf[digit]):
+            return False
+    return True
+
+
+def reference_is_valid_email(email):
+    return re.match(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$', email) is not None
+
+
+def test_batch_cpf_validation_matches_scalar_rules():
+    rng = random.Random(7)
+    cpfs = [str(rng.randrange(10**11)).zfill(11) for _ in range(5000)]
+    cpfs += ["04097026097", "040.970.260-97", "11111111111", "4097026097", "", "abc", "040970260971"]
+
+    expected = [reference_is_valid_cpf(cpf) for cpf in cpfs]
+
+    assert are_valid_cpfs(cpfs).tolist() == expected
+    assert [is_valid_cpf(cpf) for cpf in cpfs] == expected
+    assert sum(expected) > 0
+
+
+def test_batch_email_validation_matches_scalar_rules():
+    emails = ["aaa@aaa.com", "alice.silva@example.com", "first+tag@sub-domain.com.br",
+              "carla.souza", "a@b", "@example.com", "a b@example.com", "a@b.c\n", ""]
+
+    expected = [reference_is_valid_email(email) for email in emails]
+
+    assert are_valid_emails(emails).tolist() == expected
+    assert [is_valid_email(email) for email in emails] == expected
+    assert are_valid_emails([None, 42]).tolist() == [False, False]
@@ -1,19 +1,32 @@
+import numpy as np
+import pandas as pd
+
+FIRST_DIGIT_WEIGHTS = np.arange(10, 1, -1)
+SECOND_DIGIT_WEIGHTS = np.arange(11, 1, -1)
+
+
+def check_digits(weighted_sums: np.ndarray) -> np.ndarray:
+    remainders = weighted_sums % 11
+    return np.where(remainders < 2, 0, 11 - remainders)
+
+
+def are_valid_cpfs(cpfs) -> np.ndarray:
+    cpfs = pd.Series(cpfs, dtype=object).astype(str).str.replace(r'\D', '', regex=True)
+    well_formed = cpfs.str.fullmatch(r'[0-9]{11}').to_numpy(dtype=bool)
+    valid = np.zeros(len(cpfs), dtype=bool)
+    if not well_formed.any():
+        return valid
+
+    # One row of eleven digits per CPF, so both check digits are a single
+    # matrix-vector product over the whole batch.
+    digits = np.frombuffer(''.join(cpfs[well_formed]).encode('ascii'), dtype=np.uint8).reshape(-1, 11) - ord('0')
+    digits = digits.astype(np.int64)
+    first_digit = check_digits(digits[:, :9] @ FIRST_DIGIT_WEIGHTS)
+    second_digit = check_digits(digits[:, :10] @ SECOND_DIGIT_WEIGHTS)
+    repeated = (digits == digits[:, :1]).all(axis=1)
+    valid[well_formed] = (first_digit == digits[:, 9]) & (second_digit == digits[:, 10]) & ~repeated
+    return valid
+
+
 def is_valid_cpf(cpf: str) -> bool:
-    cpf = ''.join(filter(str.isdigit, cpf))
-    if len(cpf) != 11 or len(set(cpf)) == 1:
-        return False
-
-    def calculate_digit(cpf, digit):
-        if digit == 9:
-            factor = 10
-        else:
-            factor = 11
-        total = sum(int(cpf[i]) * (factor - i) for i in range(digit))
-        remainder = total % 11
-        calculated_digit = 0 if remainder < 2 else 11 - remainder
-        return calculated_digit
-
-    for digit in [9, 10]:
-        if calculate_digit(cpf, digit) != int(cpf[digit]):
-            return False
-    return True
\ No newline at end of file
+    return bool(are_valid_cpfs([cpf])[0])
@@ -1,5 +1,17 @@
 import re
+import numpy as np
+import pandas as pd
+
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$')
+# Python-backed strings match with `re`, like is_valid_email; with pyarrow
+# installed the default string type would match with Arrow's regex engine.
+PYTHON_STRING = pd.StringDtype('python', na_value=np.nan)
+
+
+def are_valid_emails(emails) -> np.ndarray:
+    emails = pd.Series(emails, dtype=object).astype(PYTHON_STRING)
+    return emails.str.match(EMAIL_PATTERN).to_numpy(dtype=bool)
+
 
 def is_valid_email(email: str) -> bool:
-    email_regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-    return re.match(email_regex, email) is not None
\ No newline at end of file
+    return EMAIL_PATTERN.match(email) is not None
@@ -0,0 +1,204 @@
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import g, request
+from sqlalchemy import event
+
+DURATION_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120]
+
+_current = ContextVar('request_metrics', default=None)
+
+
+class RequestMetrics:
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.rows = defaultdict(int)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: float) -> str:
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.phases.items()]
+        entries.append(f'db;dur={self.query_seconds * 1000:.1f};desc="{self.queries} queries"')
+        entries.append(f"total;dur={total * 1000:.1f}")
+        return ', '.join(entries)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = defaultdict(int)
+        self.durations = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.phases = defaultdict(lambda: Histogram(DURATION_BUCKETS))
+        self.queries = defaultdict(int)
+        self.query_seconds = defaultdict(float)
+        self.rows = defaultdict(int)
+
+    def record(self, metrics: RequestMetrics, total: float, status: int = None):
+        endpoint = metrics.endpoint
+        with self.lock:
+            if status is not None:
+                self.requests[(endpoint, status)] += 1
+            self.durations[endpoint].observe(total)
+            for phase_name, seconds in metrics.phases.items():
+                self.phases[(endpoint, phase_name)].observe(seconds)
+            self.queries[endpoint] += metrics.queries
+            self.query_seconds[endpoint] += metrics.query_seconds
+            for kind, count in metrics.rows.items():
+                self.rows[(endpoint, kind)] += count
+
+    def render(self, gauges: dict = None) -> str:
+        lines = []
+        with self.lock:
+            metric(lines, 'http_requests_total', 'counter', 'Requests handled.',
+                   ((labels(endpoint=endpoint, status=status), count)
+                    for (endpoint, status), count in sorted(self.requests.items())))
+            histogram(lines, 'request_duration_seconds', 'Time spent handling a request or job.',
+                      ((labels(endpoint=endpoint), values) for endpoint, values in sorted(self.durations.items())))
+            histogram(lines, 'request_phase_seconds', 'Time spent per phase of a request or job.',
+                      ((labels(endpoint=endpoint, phase=phase_name), values)
+                       for (endpoint, phase_name), values in sorted(self.phases.items())))
+            metric(lines, 'db_queries_total', 'counter', 'SQL statements executed.',
+                   ((labels(endpoint=endpoint), count) for endpoint, count in sorted(self.queries.items())))
+            metric(lines, 'db_query_seconds_total', 'counter', 'Time spent executing SQL statements.',
+                   ((labels(endpoint=endpoint), seconds) for endpoint, seconds in sorted(self.query_seconds.items())))
+            metric(lines, 'rows_processed_total', 'counter', 'Upload rows by outcome.',
+                   ((labels(endpoint=endpoint, kind=kind), count) for (endpoint, kind), count in sorted(self.rows.items())))
+        for name, (help_text, samples) in (gauges or {}).items():
+            metric(lines, name, 'gauge', help_text, samples)
+        return '\n'.join(lines) + '\n'
+
+
+def escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def labels(**values) -> str:
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in values.items()) + '}'
+
+
+def metric(lines: list, name: str, kind: str, help_text: str, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    for sample_labels, value in samples:
+        lines.append(f"{name}{sample_labels} {value}")
+
+
+def histogram(lines: list, name: str, help_text: str, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} histogram")
+    for sample_labels, values in samples:
+        inner = sample_labels[1:-1] + ','
+        for bound, count in zip(values.buckets, values.counts):
+            lines.append(f'{name}_bucket{{{inner}le="{bound}"}} {count}')
+        lines.append(f'{name}_bucket{{{inner}le="+Inf"}} {values.count}')
+        lines.append(f"{name}_sum{sample_labels} {values.sum}")
+        lines.append(f"{name}_count{sample_labels} {values.count}")
+
+
+registry = MetricsRegistry()
+
+
+@contextmanager
+def track(endpoint: str, status: int = None):
+    metrics = RequestMetrics(endpoint)
+    token = _current.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current.reset(token)
+        registry.record(metrics, metrics.elapsed(), status)
+
+
+@contextmanager
+def phase(name: str):
+    metrics = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.phases[name] += time.perf_counter() - started
+
+
+def timed(iterable, name: str):
+    iterator = iter(iterable)
+    while True:
+        with phase(name):
+            item = next(iterator, StopIteration)
+        if item is StopIteration:
+            return
+        yield item
+
+
+def add_rows(stats: dict):
+    metrics = _current.get()
+    if metrics is None:
+        return
+    for key in ('rows_read', 'rows_saved', 'rows_skipped', 'rows_rejected'):
+        if key in stats:
+            metrics.rows[key[len('rows_'):]] += stats[key]
+
+
+def instrument_engine(engine):
+    @event.listens_for(engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context.query_started = time.perf_counter()
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        metrics = _current.get()
+        started = getattr(context, 'query_started', None)
+        if metrics is not None and started is not None:
+            metrics.queries += 1
+            metrics.query_seconds += time.perf_counter() - started
+
+
+def instrument_app(app):
+    if 'instrumentation' in app.extensions:
+        return
+    app.extensions['instrumentation'] = registry
+
+    @app.before_request
+    def start_request_metrics():
+        rule = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics = RequestMetrics(f"{request.method} {rule}")
+        g.request_metrics = (metrics, _current.set(metrics))
+
+    @app.after_request
+    def finish_request_metrics(response):
+        request_metrics = g.pop('request_metrics', None)
+        if request_metrics is None:
+            return response
+        metrics, token = request_metrics
+        total = metrics.elapsed()
+        response.headers['Server-Timing'] = metrics.server_timing(total)
+        registry.record(metrics, total, response.status_code)
+        try:
+            _current.reset(token)
+        except ValueError:
+            # The response is finished in a different context than it started.
+            _current.set(None)
+        return response
@@ -0,0 +1,190 @@
+import cProfile
+import hmac
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_THRESHOLD_MS = float(os.environ.get("PROFILE_THRESHOLD_MS", 0))
+PROFILE_MAX_FILES = int(os.environ.get("PROFILE_MAX_FILES", 100))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.environ.get("PROFILE_SAMPLE_INTERVAL_MS", 5))
+PROFILE_HEADER = 'X-Profile'
+PROFILE_EXTENSIONS = ('.pstats', '.collapsed')
+
+# From Python 3.12 cProfile runs on sys.monitoring, which admits one profiler
+# per interpreter, so only one request at a time is run under it.
+cprofile_lock = threading.Lock()
+
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """Samples the stacks of registered threads from one background thread."""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.samples = {}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def start(self, thread_id: int):
+        with self.lock:
+            self.samples[thread_id] = Counter()
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self.run, name='stack-sampler', daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+
+    def stop(self, thread_id: int) -> Counter:
+        with self.lock:
+            return self.samples.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            with self.lock:
+                active = list(self.samples)
+            if not active:
+                self.wakeup.clear()
+                self.wakeup.wait()
+                continue
+            frames = sys._current_frames()
+            stacks = {}
+            for thread_id in active:
+                frame = frames.get(thread_id)
+                labels = []
+                while frame is not None:
+                    labels.append(frame_label(frame))
+                    frame = frame.f_back
+                if labels:
+                    stacks[thread_id] = ';'.join(reversed(labels))
+            with self.lock:
+                for thread_id, stack in stacks.items():
+                    if thread_id in self.samples:
+                        self.samples[thread_id][stack] += 1
+            time.sleep(self.interval)
+
+
+class RequestProfiler:
+    def __init__(self, directory: str, token: str = '', threshold_ms: float = 0, max_files: int = PROFILE_MAX_FILES,
+                 sample_interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS):
+        self.directory = directory
+        self.token = token
+        self.threshold = threshold_ms / 1000
+        self.max_files = max_files
+        self.sampler = StackSampler(sample_interval_ms / 1000)
+        self.write_lock = threading.Lock()
+
+    def requested(self, request) -> bool:
+        # Without a configured token nobody can ask for a profile.
+        supplied = request.headers.get(PROFILE_HEADER) or request.args.get('profile')
+        return bool(self.token and supplied and hmac.compare_digest(supplied, self.token))
+
+    def start(self, request):
+        explicit = self.requested(request)
+        if not explicit and not self.threshold:
+            return None
+        profile = {
+            'explicit': explicit,
+            'thread_id': threading.get_ident(),
+            'started': time.perf_counter(),
+            'cprofile': self.start_cprofile() if explicit else None
+        }
+        self.sampler.start(profile['thread_id'])
+        return profile
+
+    def start_cprofile(self):
+        # A request that finds cProfile busy, here or in a tool outside this
+        # app, falls back to the sampled stacks alone.
+        if not cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            cprofile_lock.release()
+            return None
+        return profiler
+
+    def stop(self, profile) -> Counter:
+        if profile['cprofile']:
+            profile['cprofile'].disable()
+            cprofile_lock.release()
+        return self.sampler.stop(profile['thread_id'])
+
+    def finish(self, profile, method: str, endpoint: str):
+        samples = self.stop(profile)
+        duration = time.perf_counter() - profile['started']
+        if not profile['explicit'] and duration < self.threshold:
+            return None
+
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', f"{method}-{endpoint}").strip('-')
+        name = f"{datetime.now():%Y%m%dT%H%M%S}-{slug}-{duration * 1000:.0f}ms-{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.directory, exist_ok=True)
+        if profile['cprofile']:
+            profile['cprofile'].dump_stats(os.path.join(self.directory, name + '.pstats'))
+        with open(os.path.join(self.directory, name + '.collapsed'), 'w') as file:
+            for stack, count in samples.most_common():
+                file.write(f"{stack} {count}\n")
+        self.enforce_retention()
+        return name
+
+    def enforce_retention(self):
+        # Files are kept or removed by profile, so a .pstats file never
+        # outlives the .collapsed file written with it.
+        with self.write_lock:
+            profiles = {}
+            for file_name in os.listdir(self.directory):
+                name, extension = os.path.splitext(file_name)
+                if extension in PROFILE_EXTENSIONS:
+                    path = os.path.join(self.directory, file_name)
+                    profiles.setdefault(name, []).append(path)
+            newest = {name: max(os.path.getmtime(path) for path in paths) for name, paths in profiles.items()}
+            names = sorted(profiles, key=lambda name: (newest[name], name))
+            for name in names[:max(0, len(names) - self.max_files)]:
+                for path in profiles[name]:
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+
+
+request_profiler = RequestProfiler(PROFILE_DIR, PROFILE_TOKEN, PROFILE_THRESHOLD_MS)
+
+
+def install_profiler(app, profiler: RequestProfiler = None):
+    if 'profiler' in app.extensions:
+        return
+    profiler = profiler or request_profiler
+    app.extensions['profiler'] = profiler
+
+    @app.before_request
+    def start_profile():
+        g.profile = profiler.start(request)
+
+    @app.after_request
+    def finish_profile(response):
+        profile = g.pop('profile', None)
+        if profile is not None:
+            rule = request.url_rule.rule if request.url_rule else 'unmatched'
+            name = profiler.finish(profile, request.method, rule)
+            if name:
+                response.headers['X-Profile-Id'] = name
+        return response
+
+    @app.teardown_request
+    def discard_profile(exception=None):
+        # after_request didn't run; make sure the thread stops being sampled.
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profiler.stop(profile)
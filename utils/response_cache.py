@@ -0,0 +1,83 @@
+import os
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+
+class ResponseCache:
+    def __init__(self, max_size: int, ttl: float, max_bytes: int, max_entry_bytes: int):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry['version'] != version or entry['expires_at'] < time.monotonic():
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, version, body: bytes):
+        etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.bytes -= len(previous['body'])
+            # The ETag follows the content, so a change written by another
+            # process still shows up once the entry expires.
+            if previous is not None and previous['etag'] == etag:
+                last_modified = previous['last_modified']
+            else:
+                last_modified = datetime.now(timezone.utc).replace(microsecond=0)
+            entry = {
+                'version': version,
+                'expires_at': time.monotonic() + self.ttl,
+                'body': body,
+                'etag': etag,
+                'last_modified': last_modified
+            }
+            # A body over the entry cap, such as a seller summary listing many
+            # sales, is still served with its ETag but isn't kept.
+            if self.max_size > 0 and len(body) <= min(self.max_entry_bytes, self.max_bytes):
+                self.entries[key] = entry
+                self.bytes += len(body)
+                while len(self.entries) > self.max_size or self.bytes > self.max_bytes:
+                    _, evicted = self.entries.popitem(last=False)
+                    self.bytes -= len(evicted['body'])
+            return entry
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+SUMMARY_CACHE_SIZE = int(os.environ.get("SUMMARY_CACHE_SIZE", 256))
+SUMMARY_CACHE_TTL = float(os.environ.get("SUMMARY_CACHE_TTL", 10))
+SUMMARY_CACHE_BYTES = int(os.environ.get("SUMMARY_CACHE_BYTES", 32 * 1024 * 1024))
+SUMMARY_CACHE_ENTRY_BYTES = int(os.environ.get("SUMMARY_CACHE_ENTRY_BYTES", 1024 * 1024))
+
+summary_cache = ResponseCache(SUMMARY_CACHE_SIZE, SUMMARY_CACHE_TTL, SUMMARY_CACHE_BYTES, SUMMARY_CACHE_ENTRY_BYTES)
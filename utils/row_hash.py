@@ -0,0 +1,90 @@
+import hashlib
+import numpy as np
+import pandas as pd
+
+ROW_HASH_FIELDS = ['seller_cpf', 'value', 'channel', 'date', 'client_type', 'currency']
+TEXT_FIELDS = ['seller_cpf', 'channel', 'client_type', 'currency']
+ROW_HASH_LENGTH = 32
+DIGEST_SIZE = ROW_HASH_LENGTH // 2
+SEPARATOR = '\x1f'
+
+
+def canonical_rows(sales: pd.DataFrame) -> list:
+    """Encode each sale as the text its row hash is taken over.
+
+    The fields are joined with U+001F in ROW_HASH_FIELDS order: CPF, channel,
+    client type and currency as text, the value as the repr of its float and
+    the date as whole microseconds since 1970-01-01. So 1000 and 1000.0, or a
+    datetime and a Timestamp of any resolution, encode the same way.
+    """
+    columns = {field: sales[field].astype(str).tolist() for field in TEXT_FIELDS}
+    columns['value'] = list(map(repr, sales['value'].to_numpy(dtype=np.float64).tolist()))
+    dates = pd.to_datetime(sales['date']).to_numpy(dtype='datetime64[us]').view(np.int64)
+    columns['date'] = list(map(str, dates.tolist()))
+    return [SEPARATOR.join(fields) for fields in zip(*(columns[field] for field in ROW_HASH_FIELDS))]
+
+
+class OccurrenceCounter:
+    """Counts how often each 64-bit key was seen, in amortised O(log n) per key.
+
+    Keys seen once live in sorted runs: a new chunk's keys become a run, and
+    runs are merged while the newer one is at least half the size of the one
+    before it, so there are O(log n) runs of 8 bytes per key. Only keys seen
+    more than once get an entry with their count.
+    """
+
+    def __init__(self):
+        self.runs = []
+        self.repeats = {}
+
+    def number(self, keys: np.ndarray) -> np.ndarray:
+        """Return how many times each key was seen before it, in order."""
+        unique, inverse, counts = np.unique(keys, return_inverse=True, return_counts=True)
+        seen = np.zeros(len(unique), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, unique), len(run) - 1)
+            seen |= run[positions] == unique
+        before = np.zeros(len(unique), dtype=np.int64)
+        before[seen] = [self.repeats.get(key, 1) for key in unique[seen].tolist()]
+        repeated = seen | (counts > 1)
+        self.repeats.update(zip(unique[repeated].tolist(), (before[repeated] + counts[repeated]).tolist()))
+        self.add_run(unique[~seen])
+        if not (counts > 1).any():
+            return before[inverse]
+        within = pd.Series(inverse).groupby(inverse, sort=False).cumcount().to_numpy()
+        return before[inverse] + within
+
+    def add_run(self, keys: np.ndarray):
+        if len(keys):
+            self.runs.append(keys)
+        while len(self.runs) > 1 and len(self.runs[-1]) * 2 >= len(self.runs[-2]):
+            newer = self.runs.pop()
+            older = self.runs.pop()
+            # A stable sort merges the two sorted halves in linear time.
+            self.runs.append(np.sort(np.concatenate([older, newer]), kind='stable'))
+
+
+class SaleRowHasher:
+    """Hashes the sales of one upload, numbering identical sales in file order.
+
+    A sale's row hash is the hex BLAKE2b-128 digest of its canonical_rows
+    text. The n-th repeat of the same sale in one upload (n >= 1) is hashed
+    with U+001F and n appended, so equal sales in one file are all stored,
+    while sending the same file again gives the same hashes and stores
+    nothing.
+    """
+
+    def __init__(self):
+        self.occurrences = OccurrenceCounter()
+
+    def hash(self, sales: pd.DataFrame) -> list:
+        rows = canonical_rows(sales)
+        blake2b = hashlib.blake2b
+        digests = [blake2b(row.encode(), digest_size=DIGEST_SIZE).digest() for row in rows]
+        # The first 8 bytes of a digest identify the sale while counting;
+        # sales sharing them only share a count, never a hash.
+        keys = np.frombuffer(b''.join(digests), dtype=np.uint64)[::2]
+        occurrences = self.occurrences.number(keys)
+        for index in np.flatnonzero(occurrences).tolist():
+            digests[index] = blake2b(f"{rows[index]}{SEPARATOR}{occurrences[index]}".encode(), digest_size=DIGEST_SIZE).digest()
+        return [digest.hex() for digest in digests]
@@ -0,0 +1,29 @@
+from datetime import datetime, timedelta
+
+DATE_FORMAT = "%Y-%m-%d"
+DIMENSION_FILTERS = ['channel', 'state', 'client_type', 'currency']
+
+
+def parse_filter_date(value: str, name: str):
+    try:
+        return datetime.strptime(value, DATE_FORMAT), True
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value), False
+    except ValueError:
+        raise ValueError(f"{name} must be a date (YYYY-MM-DD) or an ISO datetime")
+
+
+def parse_sales_filters(args) -> dict:
+    filters = {}
+    if args.get('from'):
+        filters['date_from'], _ = parse_filter_date(args['from'], 'from')
+    if args.get('to'):
+        date_to, date_only = parse_filter_date(args['to'], 'to')
+        # 'to' is inclusive: a plain date covers the whole day.
+        filters['date_before'] = date_to + (timedelta(days=1) if date_only else timedelta(microseconds=1))
+    for name in DIMENSION_FILTERS:
+        if args.get(name):
+            filters[name] = args[name]
+    return filters
@@ -0,0 +1,25 @@
+import json
+from flask import Response, stream_with_context
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+STREAM_BATCH_SIZE = 1000
+
+
+def wants_ndjson(request) -> bool:
+    if request.args.get('stream') == '1':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(items, session=None) -> Response:
+    # The app context is torn down before the body is consumed, so a streamed
+    # response owns its session and closes it once the last line is sent.
+    def generate():
+        try:
+            for item in items:
+                yield json.dumps(item) + '\n'
+        finally:
+            if session is not None:
+                session.close()
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,134 @@
+import os
+from contextlib import nullcontext
+import pandas as pd
+
+CSV = 'csv'
+PARQUET = 'parquet'
+ARROW_FILE = 'arrow-file'
+ARROW_STREAM = 'arrow-stream'
+
+PARQUET_MAGIC = b'PAR1'
+ARROW_FILE_MAGIC = b'ARROW1'
+ARROW_STREAM_MAGIC = b'\xff\xff\xff\xff'
+CONTENT_TYPES = {
+    'application/vnd.apache.parquet': PARQUET,
+    'application/x-parquet': PARQUET,
+    'application/parquet': PARQUET,
+    'application/vnd.apache.arrow.file': ARROW_FILE,
+    'application/vnd.apache.arrow.stream': ARROW_STREAM
+}
+COLUMNAR_BATCH_SIZE = 100_000
+
+
+class UploadFormatError(ValueError):
+    pass
+
+
+def read_head(source, size: int = 8) -> bytes:
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, 'rb') as file:
+            return file.read(size)
+    position = source.tell()
+    head = source.read(size)
+    source.seek(position)
+    return head
+
+
+def detect_format(source, content_type: str = None) -> str:
+    head = read_head(source)
+    if isinstance(head, str):
+        # Text streams can only hold CSV.
+        return CSV
+    if head.startswith(PARQUET_MAGIC):
+        return PARQUET
+    if head.startswith(ARROW_FILE_MAGIC):
+        return ARROW_FILE
+    if head.startswith(ARROW_STREAM_MAGIC):
+        return ARROW_STREAM
+    declared = CONTENT_TYPES.get(content_type, CSV)
+    # Streams written before Arrow 0.15 have no marker, so for them the
+    # content type is all there is; the other formats always start with one.
+    if declared in (PARQUET, ARROW_FILE):
+        raise UploadFormatError(f"File content does not match Content-Type {content_type}")
+    return declared
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.compute
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError as error:
+        raise UploadFormatError("Parquet and Arrow uploads require pyarrow") from error
+    return pyarrow
+
+
+def open_source(pa, source):
+    # Files on disk are memory-mapped, so fixed-width columns are read from the
+    # page cache instead of being copied through Python. File objects belong
+    # to the caller and are left open.
+    if isinstance(source, (str, os.PathLike)):
+        return pa.memory_map(os.fspath(source), 'r')
+    return nullcontext(pa.PythonFile(source, mode='r'))
+
+
+def iter_record_batches(pa, stream, file_format: str, columns: list, batch_size: int):
+    if file_format == PARQUET:
+        parquet_file = pa.parquet.ParquetFile(stream)
+        check_columns(parquet_file.schema_arrow, columns)
+        yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+    elif file_format == ARROW_FILE:
+        reader = pa.ipc.open_file(stream)
+        check_columns(reader.schema, columns)
+        for index in range(reader.num_record_batches):
+            yield reader.get_batch(index).select(columns)
+    else:
+        reader = pa.ipc.open_stream(stream)
+        check_columns(reader.schema, columns)
+        for batch in reader:
+            yield batch.select(columns)
+
+
+def check_columns(schema, columns: list):
+    missing = [name for name in columns if name not in schema.names]
+    if missing:
+        raise UploadFormatError(f"Missing columns: {', '.join(missing)}")
+
+
+def typed_batch(pa, batch, types: dict, zero_pad: dict = None):
+    zero_pad = zero_pad or {}
+    arrays = []
+    for name, type_name in types.items():
+        array = batch.column(name)
+        target = pa.type_for_alias(type_name)
+        # Text dates are left for the caller, which knows their format.
+        text_date = pa.types.is_timestamp(target) and (pa.types.is_string(array.type) or pa.types.is_large_string(array.type))
+        if not array.type.equals(target) and not text_date:
+            integer = pa.types.is_integer(array.type)
+            array = array.cast(target)
+            # Codes such as CPFs stored as integers have lost their leading zeros.
+            if integer and name in zero_pad:
+                array = pa.compute.utf8_lpad(array, width=zero_pad[name], padding='0')
+        arrays.append(array)
+    return pa.RecordBatch.from_arrays(arrays, names=list(types))
+
+
+def iter_columnar_frames(source, file_format: str, types: dict, batch_size: int = COLUMNAR_BATCH_SIZE,
+                         zero_pad: dict = None):
+    """Yield DataFrames of only the columns in `types`, cast to those Arrow types.
+
+    Integer columns named in `zero_pad` are cast to text left-padded with
+    zeros to the given width.
+    """
+    pa = import_pyarrow()
+    with open_source(pa, source) as stream:
+        for batch in iter_record_batches(pa, stream, file_format, list(types), batch_size):
+            yield typed_batch(pa, batch, types, zero_pad).to_pandas()
+
+
+def read_columnar_frame(source, file_format: str, types: dict, zero_pad: dict = None) -> pd.DataFrame:
+    frames = list(iter_columnar_frames(source, file_format, types, zero_pad=zero_pad))
+    if not frames:
+        return pd.DataFrame(columns=list(types))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,12 @@
+import os
+from tempfile import SpooledTemporaryFile
+from flask import Request
+
+UPLOAD_SPOOL_BYTES = int(os.environ.get("UPLOAD_SPOOL_BYTES", 16 * 1024 * 1024))
+
+
+class UploadRequest(Request):
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        # Uploads stay in memory up to the threshold and then roll over to an
+        # anonymous temporary file, which the OS removes once it is closed.
+        return SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode='rb+')